@@ -1,29 +1,35 @@
 import os
-from flask import Flask, render_template, request, send_from_directory, jsonify, url_for, redirect
+from flask import Flask, render_template, request, send_from_directory, jsonify, url_for, redirect, Response, stream_with_context
+import json
 from dotenv import load_dotenv
-from murf import Murf
-from pydub import AudioSegment
 import uuid
-import requests
-import io
 import logging
-import google.generativeai as genai # For Google Gemini
+
+# Load .env before the project modules below read their settings at import
+load_dotenv()
+
 from pptx import Presentation # For reading .pptx files
 import PyPDF2 # For reading PDF files
 from blog_generator import BlogGenerator
-from youtube_transcript import extract_video_id, get_transcript, summarize_with_gemini, transcribe_video_file
-from audio_transcript import extract_transcript, get_supported_languages
+from youtube_transcript import (extract_video_id, get_transcript, summarize_with_gemini, transcribe_video_file, VIDEO_MAX_CHUNK_MS,
+                                get_transcript_records, transcript_header,
+                                parse_youtube_urls, process_youtube_batch, YOUTUBE_BATCH_MAX_VIDEOS)
+from audio_transcript import extract_transcript, get_supported_languages, iter_transcript, transcript_text
 from google.cloud import storage
-from gcs_utils import upload_to_gcs, generate_gcs_signed_url
+from gcs_utils import upload_to_gcs, generate_gcs_signed_url, local_blob_path, DEPLOYMENT_ENV
+from gemini_registry import configure_gemini, start_warm_up
+from llm_cache import cache_metrics
+from upload_ingest import (UploadRequest, ingest_upload, check_request_size, read_text_upload, UploadTooLarge,
+                           AUDIO_UPLOAD_MAX_MB, VIDEO_UPLOAD_MAX_MB, TEXT_UPLOAD_MAX_MB)
 
 # Import Blueprints
 from presentation_converter import presentation_bp
-from podcast_generator import podcast_bp, get_voice_config, detect_language
+from podcast_generator import podcast_bp, convert_script_to_podcast
 from video_prompt_generator import generate_video_storyboard
 
-load_dotenv()
-
 app = Flask(__name__)
+# Parse uploaded files straight into the scratch directory, hashing them on the way
+app.request_class = UploadRequest
 app.config['UPLOAD_FOLDER'] = 'output_audio'
 app.config['MAX_CONTENT_LENGTH'] = 1000 * 1024 * 1024  # 100 MB upload limit
 
@@ -45,7 +51,9 @@ if not GEMINI_API_KEY:
     print("Error: GEMINI_API_KEY not found in .env file.") # Or use app.logger
 else:
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
+        # Configure once per process and warm the model handles in the background
+        configure_gemini(GEMINI_API_KEY)
+        start_warm_up(api_key=GEMINI_API_KEY)
         # app.logger will be available after app initialization for logging this
         # For now, print or basic log before app context is fully up for blueprints
         print("Google Gemini API configured successfully.")
@@ -53,31 +61,6 @@ else:
         print(f"Failed to configure Google Gemini API: {e}")
 
 
-def parse_script(script_text):
-    """Parses the input script into a list of dictionaries.
-    Each dictionary: {'speaker': 'HOST'/'Voice X', 'text': '...'}
-    Example input:
-    HOST: Hello world!
-    Voice 1: This is a test.
-    """
-    lines = script_text.strip().split('\n')
-    parsed_script = []
-    for line in lines:
-        line = line.strip()
-        if ':' in line:
-            parts = line.split(':', 1)
-            speaker = parts[0].strip()
-            text = parts[1].strip()
-            if speaker and text: # Ensure both speaker and text are present
-                parsed_script.append({'speaker': speaker, 'text': text})
-        elif line: # Handle lines without a speaker, perhaps assign to a default or skip
-            # For now, let's assume lines without ':' are continuations or to be ignored
-            # Or, assign to a default speaker if that's the desired behavior
-            # For this implementation, we'll only process lines with "speaker: text" format
-            app.logger.info(f"Skipping line without speaker: {line}")
-            pass 
-    return parsed_script
-
 # --- End of helper functions ---
 
 @app.route('/', methods=['GET'])
@@ -86,109 +69,16 @@ def index():
 
 @app.route('/convert_podcast', methods=['GET', 'POST'])
 def convert_podcast():
-    script_text_from_area = ""
-    if request.method == 'POST':
-        script_text_from_area = request.form.get('script')
-        script_file = request.files.get('script_file')
-        final_script_text = ""
-
-        if script_file and script_file.filename != '':
-            try:
-                if script_file.content_type.startswith('text/'):
-                    final_script_text = script_file.read().decode('utf-8')
-                    app.logger.info(f"Successfully read script from uploaded file: {script_file.filename}")
-                else:
-                    return render_template('convert_podcast.html', error="Invalid file type. Please upload a text file (e.g., .txt, .md).", script_text=script_text_from_area)
-            except Exception as e:
-                app.logger.error(f"Error reading uploaded file: {e}")
-                return render_template('convert_podcast.html', error=f"Error reading uploaded file: {str(e)}", script_text=script_text_from_area)
-        elif script_text_from_area:
-            final_script_text = script_text_from_area
-        else:
-            return render_template('convert_podcast.html', error="Script text or a script file is required.", script_text=script_text_from_area)
-
-        if not final_script_text.strip():
-             return render_template('convert_podcast.html', error="Script content is empty.", script_text=script_text_from_area)
-
-        if not MURFA_API_KEY:
-            return render_template('convert_podcast.html', error="Murf AI API Key is not configured. Please contact the administrator.", script_text=final_script_text)
-
-        try:
-            app.logger.info("Starting audio generation process.")
-            parsed_script = parse_script(final_script_text)
-            if not parsed_script:
-                return render_template('convert_podcast.html', error="Could not parse the script. Ensure it follows 'SPEAKER: Text' format or the file content is valid.", script_text=final_script_text)
-
-            # Detect language from the first non-empty text segment
-            output_language = 'en'  # default
-            for item in parsed_script:
-                if item['text'].strip():
-                    output_language = detect_language(item['text'])
-                    app.logger.info(f"Detected language: {output_language}")
-                    break
-
-            audio_segments = []
-            murf_client = Murf(api_key=MURFA_API_KEY)
-            app.logger.info(f"Parsed script: {parsed_script}")
-
-            for i, item in enumerate(parsed_script):
-                app.logger.info(f"Processing segment {i+1}/{len(parsed_script)}: Speaker: {item['speaker']}, Text: {item['text'][:30]}...")
-                voice_id = get_voice_config(item['speaker'], output_language=output_language)
-                app.logger.info(f"Generating audio for: '{item['text']}' with voice '{voice_id}'")
-                tts_response = murf_client.text_to_speech.generate(
-                    text=item['text'],
-                    voice_id=voice_id
-                )
-                audio_url = tts_response.audio_file
-                app.logger.info(f"Audio URL received from Murf SDK: {audio_url}")
-                audio_download_response = requests.get(audio_url)
-                audio_download_response.raise_for_status()
-                file_extension = audio_url.split('?')[0].split('.')[-1].lower()
-                if file_extension not in ['mp3', 'wav', 'ogg', 'flv', 'aac']:
-                    app.logger.warning(f"Unexpected audio file extension '{file_extension}' from Murf, attempting to load as wav.")
-                    file_extension = "wav"
-                segment_audio = AudioSegment.from_file(io.BytesIO(audio_download_response.content), format=file_extension)
-                audio_segments.append(segment_audio)
-                app.logger.info(f"Segment {i+1} processed and added from URL.")
-
-            if not audio_segments:
-                return render_template('convert_podcast.html', error="No audio segments were generated. Check script and API logs.", script_text=final_script_text)
-
-            app.logger.info("Combining audio segments...")
-            combined_audio = AudioSegment.empty()
-            for segment in audio_segments:
-                combined_audio += segment
-            unique_filename = f"final_audio_{uuid.uuid4().hex}.mp3"
-            output_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            app.logger.info(f"Exporting combined audio to {output_path}")
-            combined_audio.export(output_path, format="mp3")
-            gcs_blob_name = f"audio/{unique_filename}"
-            gcs_url = upload_to_gcs(output_path, gcs_blob_name)
-            if os.path.exists(output_path):
-                os.remove(output_path)
-            app.logger.info("Audio generation successful.")
-            return render_template('convert_podcast.html', audio_file_url=gcs_url, script_text=final_script_text)
-        except requests.exceptions.HTTPError as http_err:
-            app.logger.error(f"HTTP error during Murf API audio download: {http_err}")
-            app.logger.error(f"Response content: {http_err.response.content if http_err.response else 'No response content'}")
-            return render_template('convert_podcast.html', error=f"An HTTP error occurred while downloading audio from Murf: {http_err}", script_text=final_script_text)
-        except Murf.ApiError as murf_api_err:
-            app.logger.error(f"Murf API Error: Status {murf_api_err.status_code}, Body: {murf_api_err.body}", exc_info=True)
-            error_message = f"Murf API Error (Status {murf_api_err.status_code}). "
-            if murf_api_err.status_code == 502:
-                error_message += "This might be a temporary issue with the Murf AI service (Bad Gateway). Please try again shortly or check the voice ID and text segment."
-            else:
-                error_message += "Please check your script, API key, and Murf AI account status."
-            return render_template('convert_podcast.html', error=error_message, script_text=final_script_text)
-        except Exception as e:
-            app.logger.error(f"Error during audio generation: {e}", exc_info=True)
-            return render_template('convert_podcast.html', error=f"An unexpected error occurred: {str(e)}", script_text=final_script_text)
-
-    return render_template('convert_podcast.html', script_text=script_text_from_area)
+    # Same rendering engine and behavior as the blueprint route
+    return convert_script_to_podcast()
 
 @app.route('/convert_to_blog', methods=['GET', 'POST'])
 def convert_to_blog():
     if request.method == 'POST':
+        try:
+            check_request_size(TEXT_UPLOAD_MAX_MB)
+        except UploadTooLarge as e:
+            return render_template('convert_to_blog.html', error=str(e))
         script_text = request.form.get('script')
         script_file = request.files.get('script_file')
         blog_style = request.form.get('blog_style', 'informative')
@@ -197,7 +87,7 @@ def convert_to_blog():
         if script_file and script_file.filename != '':
             try:
                 if script_file.content_type.startswith('text/') or script_file.filename.endswith(('.txt', '.md')):
-                    final_script_text = script_file.read().decode('utf-8')
+                    final_script_text = read_text_upload(script_file)
                 else:
                     return render_template('convert_to_blog.html', error="Invalid file type. Please upload a text file (e.g., .txt, .md).", script_text=script_text)
             except Exception as e:
@@ -249,15 +139,63 @@ def download_blog():
 def download_file(filename):
     try:
         blob_name = f"audio/{filename}"
+        if DEPLOYMENT_ENV != "cloud":
+            local_path = local_blob_path(blob_name)
+            return send_from_directory(os.path.abspath(os.path.dirname(local_path)), os.path.basename(local_path), mimetype='audio/mpeg')
         signed_url = generate_gcs_signed_url(blob_name)
         return redirect(signed_url)
     except Exception as e:
         app.logger.error(f"Error generating signed URL for audio: {e}")
         return str(e), 500
 
+# Speech recognition language for the video page's language choices
+VIDEO_SPEECH_LANGUAGES = {'en': 'en-US', 'ko': 'ko-KR'}
+
+def sse_event(data, event=None):
+    """Format one server-sent event carrying a JSON payload."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_transcript_events(upload, language, max_chunk_ms, summary_language=None):
+    """Server-sent events for a transcription: one 'message' per recognized chunk, then 'done' (or 'error').
+
+    Each chunk event carries start_ms, end_ms and text as soon as the chunk
+    and all chunks before it are recognized. With summary_language a
+    'summary' event follows 'done'. The IngestedUpload is removed when the
+    stream ends.
+    """
+    try:
+        records = []
+        for start_ms, end_ms, text in iter_transcript(upload.path, language, max_chunk_ms=max_chunk_ms,
+                                                      media_sha256=upload.sha256):
+            records.append((start_ms, end_ms, text))
+            yield sse_event({'start_ms': start_ms, 'end_ms': end_ms, 'text': text})
+        if not records:
+            yield sse_event({'error': "Could not generate transcript from any part of the audio"}, event='error')
+            return
+        transcript = transcript_text(records)
+        yield sse_event({'transcript': transcript}, event='done')
+        if summary_language and GEMINI_API_KEY:
+            yield sse_event({'summary': summarize_with_gemini(transcript, GEMINI_API_KEY, preferred_language=summary_language)},
+                            event='summary')
+    except Exception as e:
+        app.logger.error(f"Error streaming transcript: {e}")
+        yield sse_event({'error': str(e)}, event='error')
+    finally:
+        upload.remove()
+
+def event_stream_response(events):
+    # Disable proxy buffering so every event reaches the browser as it is produced
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/youtube_transcript', methods=['GET', 'POST'])
 def youtube_transcript():
     if request.method == 'POST':
+        try:
+            check_request_size(VIDEO_UPLOAD_MAX_MB)
+        except UploadTooLarge as e:
+            return render_template('youtube_transcript.html', error=str(e))
         youtube_url = request.form.get('youtube_url')
         language = request.form.get('language', 'en')
         video_file = request.files.get('video_file')
@@ -268,27 +206,15 @@ def youtube_transcript():
         try:
             if video_file and video_file.filename != '':
                 # Handle uploaded video file
-                import tempfile
-                from youtube_transcript import transcribe_video_file, summarize_with_gemini
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(video_file.filename)[-1]) as temp_video:
-                    video_file.save(temp_video.name)
-                    temp_video_path = temp_video.name
-                try:
+                with ingest_upload(video_file, VIDEO_UPLOAD_MAX_MB, suffix=os.path.splitext(video_file.filename)[-1]) as upload:
                     # Use language code for speech_recognition (e.g., 'en-US', 'ko-KR')
-                    lang_map = {
-                        'en': 'en-US', 'ko': 'ko-KR'
-                    }
-                    sr_language = lang_map.get(language, 'en-US')
+                    sr_language = VIDEO_SPEECH_LANGUAGES.get(language, 'en-US')
                     app.logger.info(f"Transcribing video file with language: {sr_language}")
-                    transcript = transcribe_video_file(temp_video_path, language=sr_language)
-                finally:
-                    if os.path.exists(temp_video_path):
-                        os.remove(temp_video_path)
+                    transcript = transcribe_video_file(upload.path, language=sr_language, media_sha256=upload.sha256)
                 if GEMINI_API_KEY:
                     summary = summarize_with_gemini(transcript, GEMINI_API_KEY, preferred_language=language)
             elif youtube_url:
                 # Handle YouTube URL as before
-                from youtube_transcript import extract_video_id, get_transcript, summarize_with_gemini
                 video_id = extract_video_id(youtube_url)
                 if not video_id:
                     error = "Invalid YouTube URL."
@@ -308,6 +234,10 @@ def youtube_transcript():
 @app.route('/audio_transcript', methods=['GET', 'POST'])
 def audio_transcript():
     if request.method == 'POST':
+        try:
+            check_request_size(AUDIO_UPLOAD_MAX_MB)
+        except UploadTooLarge as e:
+            return render_template('audio_transcript.html', error=str(e), languages=get_supported_languages())
         if 'audio_file' not in request.files:
             return render_template('audio_transcript.html', 
                                  error="No audio file provided.",
@@ -322,16 +252,10 @@ def audio_transcript():
                                  languages=get_supported_languages())
         
         try:
-            # Save the uploaded file temporarily
-            temp_file = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{uuid.uuid4().hex}")
-            audio_file.save(temp_file)
-            
-            # Extract transcript
-            transcript = extract_transcript(temp_file, language)
-            
-            # Clean up temporary file
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+            # Stream the upload to a scratch file; it is removed when the block exits
+            with ingest_upload(audio_file, AUDIO_UPLOAD_MAX_MB) as upload:
+                # Extract transcript (repeat uploads of the same recording come from the cache)
+                transcript = extract_transcript(upload.path, language, media_sha256=upload.sha256)
             
             return render_template('audio_transcript.html', 
                                  transcript=transcript,
@@ -339,20 +263,109 @@ def audio_transcript():
             
         except Exception as e:
             app.logger.error(f"Error processing audio file: {e}")
-            # Clean up temporary file if it exists
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
             return render_template('audio_transcript.html', 
                                  error=str(e),
                                  languages=get_supported_languages())
     
     return render_template('audio_transcript.html', languages=get_supported_languages())
 
+@app.route('/audio_transcript/stream', methods=['POST'])
+def audio_transcript_stream():
+    """Transcribe an uploaded recording and stream timestamped chunks as server-sent events."""
+    try:
+        check_request_size(AUDIO_UPLOAD_MAX_MB)
+        audio_file = request.files.get('audio_file')
+        language = request.form.get('language', 'en-US')
+        if not audio_file or audio_file.filename == '':
+            return jsonify({'error': "No audio file provided."}), 400
+        upload = ingest_upload(audio_file, AUDIO_UPLOAD_MAX_MB)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    return event_stream_response(stream_transcript_events(upload, language, 30000))
+
+@app.route('/youtube_transcript/stream', methods=['POST'])
+def youtube_transcript_stream():
+    """Stream a video's transcript as timestamped events: recognized chunks for uploads, caption snippets for YouTube links."""
+    try:
+        check_request_size(VIDEO_UPLOAD_MAX_MB)
+        language = request.form.get('language', 'en')
+        video_file = request.files.get('video_file')
+        youtube_url = request.form.get('youtube_url')
+        upload = None
+        if video_file and video_file.filename != '':
+            upload = ingest_upload(video_file, VIDEO_UPLOAD_MAX_MB, suffix=os.path.splitext(video_file.filename)[-1])
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+
+    if upload:
+        sr_language = VIDEO_SPEECH_LANGUAGES.get(language, 'en-US')
+        app.logger.info(f"Streaming transcript of video file with language: {sr_language}")
+        return event_stream_response(stream_transcript_events(upload, sr_language, VIDEO_MAX_CHUNK_MS,
+                                                              summary_language=language))
+    if not youtube_url:
+        return jsonify({'error': "Please provide a YouTube URL or upload a video file."}), 400
+    video_id = extract_video_id(youtube_url)
+    if not video_id:
+        return jsonify({'error': "Invalid YouTube URL."}), 400
+
+    def generate():
+        try:
+            source, records = get_transcript_records(video_id, language=language)
+            if not records:
+                yield sse_event({'error': "Could not generate transcript."}, event='error')
+                return
+            for start_ms, end_ms, text in records:
+                yield sse_event({'start_ms': start_ms, 'end_ms': end_ms, 'text': text})
+            transcript = transcript_header(source) + transcript_text(records)
+            yield sse_event({'transcript': transcript, 'source': source}, event='done')
+            if GEMINI_API_KEY:
+                yield sse_event({'summary': summarize_with_gemini(transcript, GEMINI_API_KEY, preferred_language=language)},
+                                event='summary')
+        except Exception as e:
+            app.logger.error(f"Error streaming YouTube transcript: {e}")
+            yield sse_event({'error': str(e)}, event='error')
+
+    return event_stream_response(generate())
+
+@app.route('/youtube_transcript/batch', methods=['GET', 'POST'])
+def youtube_transcript_batch():
+    """Transcripts (and summaries) for many YouTube videos in one submission."""
+    if request.method == 'POST':
+        language = request.form.get('language', 'en')
+        youtube_urls = request.form.get('youtube_urls', '')
+        try:
+            check_request_size(TEXT_UPLOAD_MAX_MB)
+            url_file = request.files.get('url_file')
+            urls_text = youtube_urls
+            if url_file and url_file.filename != '':
+                urls_text += "\n" + read_text_upload(url_file)
+            urls = parse_youtube_urls(urls_text)
+            if not urls:
+                raise ValueError("Please provide at least one YouTube URL.")
+            if len(urls) > YOUTUBE_BATCH_MAX_VIDEOS:
+                raise ValueError(f"Too many videos. A batch can contain up to {YOUTUBE_BATCH_MAX_VIDEOS} URLs.")
+            app.logger.info(f"Processing YouTube batch of {len(urls)} URLs, language: {language}")
+            results = process_youtube_batch(urls, language=language, api_key=GEMINI_API_KEY)
+        except Exception as e:
+            app.logger.error(f"Error processing YouTube batch: {e}")
+            return render_template('youtube_batch.html', error=str(e), youtube_urls=youtube_urls, language=language)
+        return render_template('youtube_batch.html', results=results, youtube_urls=youtube_urls, language=language)
+    return render_template('youtube_batch.html')
+
+@app.route('/metrics/llm_cache', methods=['GET'])
+def llm_cache_metrics():
+    """Hit rate and bytes saved by the LLM response cache (counters are per worker process)."""
+    return jsonify(cache_metrics())
+
 @app.route('/convert_text_to_script', methods=['GET', 'POST'])
 def convert_text_to_script():
     transcript_result = None
     transcript_text_input = None
     if request.method == 'POST':
+        try:
+            check_request_size(TEXT_UPLOAD_MAX_MB)
+        except UploadTooLarge as e:
+            return render_template('convert_text_to_script.html', error=str(e))
         text_input = request.form.get('text_input')
         transcript_text_input = request.form.get('transcript_text_input')
         text_file = request.files.get('text_file')
@@ -371,7 +384,7 @@ def convert_text_to_script():
         if text_file and text_file.filename != '':
             try:
                 if text_file.content_type.startswith('text/') or text_file.filename.endswith(('.txt', '.md')):
-                    final_text = text_file.read().decode('utf-8')
+                    final_text = read_text_upload(text_file)
                 else:
                     return render_template('convert_text_to_script.html', error="Invalid file type. Please upload a text file (e.g., .txt, .md).", text_input=text_input)
             except Exception as e:
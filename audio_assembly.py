@@ -0,0 +1,38 @@
+from pydub import AudioSegment
+
+def common_audio_format(segments):
+    """Pick a (frame_rate, sample_width, channels) that every segment can be converted to losslessly."""
+    return (
+        max(segment.frame_rate for segment in segments),
+        max(segment.sample_width for segment in segments),
+        max(segment.channels for segment in segments),
+    )
+
+def normalize_segment(segment, frame_rate, sample_width, channels):
+    """Convert a segment to the target format, skipping conversions that are already satisfied."""
+    if segment.frame_rate != frame_rate:
+        segment = segment.set_frame_rate(frame_rate)
+    if segment.sample_width != sample_width:
+        segment = segment.set_sample_width(sample_width)
+    if segment.channels != channels:
+        segment = segment.set_channels(channels)
+    return segment
+
+def assemble_segments(segments):
+    """Join audio segments in a single pass into one PCM buffer.
+
+    Repeated `combined += segment` copies the whole accumulated buffer on every
+    step (quadratic in episode length); here each segment is normalized and
+    its raw frames appended to the output buffer in turn, so at most one
+    converted copy of a segment exists alongside the buffer at a time.
+    """
+    if not segments:
+        return AudioSegment.empty()
+    frame_rate, sample_width, channels = common_audio_format(segments)
+
+    # bytearray grows geometrically, so appending is linear overall
+    buffer = bytearray()
+    for segment in segments:
+        buffer += normalize_segment(segment, frame_rate, sample_width, channels).raw_data
+
+    return AudioSegment(data=buffer, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
@@ -0,0 +1,115 @@
+import subprocess
+import threading
+from pydub.utils import get_encoder_name
+from audio_assembly import normalize_segment
+
+# Bytes of PCM fed to (and MP3 read from) the encoder per pipe operation
+PIPE_CHUNK_SIZE = 64 * 1024
+
+# 8-bit WAV/pydub PCM is unsigned; wider samples are signed little-endian
+PCM_FORMATS = {1: 'u8', 2: 's16le', 4: 's32le'}
+
+class ProgressiveMP3Encoder:
+    """Incremental MP3 encoder: feed AudioSegments in order, MP3 bytes flow to the outputs as produced.
+
+    A single ffmpeg process is started on the first write using that
+    segment's sample format; later segments are converted to match, so the
+    output is one continuous MP3 stream. Encoded bytes are copied to every
+    output (any object with write(), and flush() if present) by a reader
+    thread as soon as ffmpeg emits them.
+    """
+
+    def __init__(self, outputs, bitrate="128k"):
+        self.outputs = list(outputs)
+        self.bitrate = bitrate
+        self.audio_format = None
+        self.duration_ms = 0
+        self.bytes_written = 0
+        self._process = None
+        self._reader = None
+        self._reader_error = None
+
+    def _start(self, frame_rate, sample_width, channels):
+        command = [
+            get_encoder_name(), '-hide_banner', '-loglevel', 'error',
+            '-f', PCM_FORMATS[sample_width], '-ar', str(frame_rate), '-ac', str(channels),
+            '-i', 'pipe:0',
+            '-f', 'mp3', '-b:a', self.bitrate, '-flush_packets', '1', 'pipe:1',
+        ]
+        self.audio_format = (frame_rate, sample_width, channels)
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._reader = threading.Thread(target=self._drain, daemon=True)
+        self._reader.start()
+
+    def _drain(self):
+        try:
+            while True:
+                chunk = self._process.stdout.read1(PIPE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                for output in self.outputs:
+                    output.write(chunk)
+                    if hasattr(output, 'flush'):
+                        output.flush()
+                self.bytes_written += len(chunk)
+        except Exception as e:
+            # Stop the encoder so a blocked writer sees a broken pipe instead of hanging
+            self._reader_error = e
+            self._process.kill()
+
+    def write(self, segment):
+        if self._process is None:
+            self._start(segment.frame_rate, segment.sample_width, segment.channels)
+        else:
+            segment = normalize_segment(segment, *self.audio_format)
+        view = memoryview(segment.raw_data)
+        try:
+            for offset in range(0, len(view), PIPE_CHUNK_SIZE):
+                self._process.stdin.write(view[offset:offset + PIPE_CHUNK_SIZE])
+        except (BrokenPipeError, OSError):
+            self._finish()
+            raise
+        finally:
+            view.release()
+        self.duration_ms += len(segment)
+
+    def _finish(self):
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._reader.join()
+        stderr = self._process.stderr.read()
+        self._process.wait()
+        self._process.stdout.close()
+        self._process.stderr.close()
+        if self._reader_error is not None:
+            raise self._reader_error
+        if self._process.returncode != 0:
+            raise RuntimeError(f"MP3 encoding failed (ffmpeg exit {self._process.returncode}): {stderr.decode('utf-8', 'replace').strip()}")
+
+    def close(self):
+        """Flush the encoder and wait for every MP3 byte to reach the outputs."""
+        if self._process is not None:
+            self._finish()
+        return self.bytes_written
+
+    def abort(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+def encode_mp3_stream(audio, output_stream, bitrate="128k"):
+    """Encode an AudioSegment to MP3 and write the encoder output to a stream as it is produced.
+
+    Raw PCM is piped into ffmpeg and its stdout is copied to output_stream
+    chunk by chunk, so neither the WAV input nor the MP3 output is written to a
+    temporary file. Returns the number of MP3 bytes written.
+    """
+    encoder = ProgressiveMP3Encoder([output_stream], bitrate=bitrate)
+    try:
+        encoder.write(audio)
+    except Exception:
+        encoder.abort()
+        raise
+    return encoder.close()
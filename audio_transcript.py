@@ -1,121 +1,139 @@
 import speech_recognition as sr
 import os
-from pydub import AudioSegment
-import tempfile
+from collections import deque
+from speech_chunker import iter_media_speech_chunks
+from transcript_cache import (get_transcript_cache, media_cache_key, get_checkpoint_store, checkpoint_job_key,
+                              checkpoint_chunk_key)
 import time
 from requests.exceptions import RequestException
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import storage
 
 GCS_BUCKET_NAME = 'startup-consulting'
+# Number of audio chunks sent to the recognizer concurrently
+TRANSCRIBE_MAX_WORKERS = int(os.getenv("TRANSCRIBE_MAX_WORKERS", "4"))
 
-def preprocess_audio(audio_file_path):
-    """Preprocess audio file to ensure compatibility with speech recognition."""
-    try:
-        # Load the audio file
-        audio = AudioSegment.from_file(audio_file_path)
-        
-        # Convert to mono if stereo
-        if audio.channels > 1:
-            audio = audio.set_channels(1)
-        
-        # Set sample rate to 16kHz (optimal for speech recognition)
-        audio = audio.set_frame_rate(16000)
-        
-        # Normalize audio
-        audio = audio.normalize()
-        
-        # Create a temporary file for the processed audio
-        temp_processed = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_processed.close()
-        
-        # Export the processed audio
-        audio.export(temp_processed.name, format='wav')
-        return temp_processed.name
-    except Exception as e:
-        if os.path.exists(temp_processed.name):
-            os.unlink(temp_processed.name)
-        raise Exception(f"Error preprocessing audio: {str(e)}")
+def recognize_chunk(audio_data, language='en-US', max_retries=3, retry_delay=2):
+    """Recognize one chunk (sr.AudioData) with its own retry/backoff. Returns None for unintelligible audio."""
+    recognizer = sr.Recognizer()
+    for attempt in range(max_retries):
+        try:
+            return recognizer.recognize_google(audio_data, language=language)
+        except sr.UnknownValueError:
+            # If we can't understand this chunk, just skip it
+            return None
+        except (sr.RequestError, RequestException) as e:
+            if attempt < max_retries - 1:
+                time.sleep(retry_delay * (attempt + 1))
+                continue
+            raise Exception(f"Could not request results from Speech Recognition service after {max_retries} attempts: {str(e)}")
 
-def chunk_audio(audio_file_path, chunk_length_ms=30000):
-    """Split audio into smaller chunks for processing."""
-    try:
-        audio = AudioSegment.from_file(audio_file_path)
-        chunks = []
-        
-        # Split audio into chunks
-        for i in range(0, len(audio), chunk_length_ms):
-            chunk = audio[i:i + chunk_length_ms]
-            # Create temporary file for chunk
-            temp_chunk = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-            temp_chunk.close()
-            # Export chunk
-            chunk.export(temp_chunk.name, format='wav')
-            chunks.append(temp_chunk.name)
-        
-        return chunks
-    except Exception as e:
-        # Clean up any created temporary files
-        for chunk_file in chunks:
-            if os.path.exists(chunk_file):
-                os.unlink(chunk_file)
-        raise Exception(f"Error chunking audio: {str(e)}")
+def recognize_checkpointed_chunk(checkpoints, chunk_key, audio_data, language='en-US', max_retries=3, retry_delay=2):
+    """recognize_chunk that reuses a checkpointed result and checkpoints new ones."""
+    text = checkpoints.get(chunk_key)
+    if text is not None:
+        return text or None
+    text = recognize_chunk(audio_data, language, max_retries, retry_delay)
+    checkpoints.put(chunk_key, text or '')
+    return text
+
+def iter_recognized_chunks(chunks, language='en-US', max_retries=3, retry_delay=2, max_workers=TRANSCRIBE_MAX_WORKERS,
+                           checkpoints=None, job_key=None):
+    """Recognize (start_ms, end_ms, sr.AudioData) chunks concurrently and yield (start_ms, end_ms, text) in order.
+
+    chunks may be a lazy iterator; only a couple of chunks per worker are
+    pulled ahead of recognition, so a long recording is never held in memory
+    as a whole. Each record is yielded as soon as it and every chunk before
+    it are done; unintelligible chunks are left out. With a checkpoint store
+    and job_key every recognized chunk is recorded, and chunks recorded by an
+    earlier attempt of the same job are not sent to the recognizer again.
+    """
+    max_workers = max(1, max_workers)
+    pending = deque()
+
+    def submit(executor, start_ms, end_ms, audio_data):
+        if checkpoints is None:
+            return executor.submit(recognize_chunk, audio_data, language, max_retries, retry_delay)
+        chunk_key = checkpoint_chunk_key(job_key, start_ms, end_ms)
+        return executor.submit(recognize_checkpointed_chunk, checkpoints, chunk_key, audio_data,
+                               language, max_retries, retry_delay)
+
+    def next_record():
+        start_ms, end_ms, future = pending.popleft()
+        return start_ms, end_ms, future.result()
 
-def extract_transcript(audio_file_path, language='en-US', max_retries=3, retry_delay=2):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for start_ms, end_ms, audio_data in chunks:
+                future = submit(executor, start_ms, end_ms, audio_data)
+                pending.append((start_ms, end_ms, future))
+                while pending and (len(pending) >= max_workers * 2 or pending[0][2].done()):
+                    record = next_record()
+                    if record[2]:
+                        yield record
+            while pending:
+                record = next_record()
+                if record[2]:
+                    yield record
+        finally:
+            # A chunk exhausted its retries or the consumer went away; don't start the ones still queued
+            for _, _, future in pending:
+                future.cancel()
+
+def iter_transcript(media_file_path, language='en-US', max_chunk_ms=30000, max_retries=3, retry_delay=2, media_sha256=None):
+    """Recognize the speech in any audio or video file, yielding (start_ms, end_ms, text) as chunks complete.
+
+    The audio stream is decoded to 16 kHz mono PCM and chunked as it is read,
+    so memory stays bounded however long the recording is and no
+    intermediate audio files are written. Chunks are cut at pauses and
+    silence is skipped. With media_sha256 (the hash of the uploaded bytes)
+    a finished transcript is cached, and later requests for the same
+    recording and language replay it without recognition; an attempt that
+    fails part-way leaves per-chunk checkpoints, so retrying the same
+    upload only recognizes the chunks that are still missing.
+    """
+    cache = get_transcript_cache() if media_sha256 else None
+    cache_key = media_cache_key(media_sha256, language) if media_sha256 else None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            for start_ms, end_ms, text in cached:
+                yield start_ms, end_ms, text
+            return
+
+    checkpoints = get_checkpoint_store() if media_sha256 else None
+    job_key = checkpoint_job_key(media_sha256, language, max_chunk_ms) if media_sha256 else None
+    records = []
+    chunks = iter_media_speech_chunks(media_file_path, max_chunk_ms=max_chunk_ms)
+    for record in iter_recognized_chunks(chunks, language, max_retries, retry_delay,
+                                         checkpoints=checkpoints, job_key=job_key):
+        records.append(record)
+        yield record
+    if cache is not None and records:
+        cache.put(cache_key, records)
+    if checkpoints is not None:
+        # The job is complete; its transcript now lives in the transcript cache
+        checkpoints.delete_prefix(job_key)
+
+def transcribe_media(media_file_path, language='en-US', max_chunk_ms=30000, max_retries=3, retry_delay=2, media_sha256=None):
+    """Return the (start_ms, end_ms, text) records of a recording; see iter_transcript."""
+    return list(iter_transcript(media_file_path, language, max_chunk_ms, max_retries, retry_delay, media_sha256))
+
+def transcript_text(records):
+    return " ".join(text for _, _, text in records)
+
+def extract_transcript(audio_file_path, language='en-US', max_retries=3, retry_delay=2, media_sha256=None):
     """Extract transcript from audio file using Google Speech Recognition with retry logic."""
-    temp_files = []
     try:
-        # Preprocess the audio file
-        processed_audio = preprocess_audio(audio_file_path)
-        temp_files.append(processed_audio)
-
-        # Split into chunks
-        audio = AudioSegment.from_file(processed_audio)
-        chunk_length_ms = 30000
-        num_chunks = (len(audio) + chunk_length_ms - 1) // chunk_length_ms
-        audio_chunks = []
-        for i in range(num_chunks):
-            start_ms = i * chunk_length_ms
-            end_ms = min((i + 1) * chunk_length_ms, len(audio))
-            chunk = audio[start_ms:end_ms]
-            temp_chunk = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-            temp_chunk.close()
-            chunk.export(temp_chunk.name, format='wav')
-            audio_chunks.append(temp_chunk.name)
-        temp_files.extend(audio_chunks)
-
-        recognizer = sr.Recognizer()
-        full_transcript = []
-        for chunk_file in audio_chunks:
-            for attempt in range(max_retries):
-                try:
-                    with sr.AudioFile(chunk_file) as source:
-                        audio_data = recognizer.record(source)
-                    chunk_transcript = recognizer.recognize_google(audio_data, language=language)
-                    full_transcript.append(chunk_transcript)
-                    break
-                except sr.UnknownValueError:
-                    # If we can't understand this chunk, just skip it
-                    break
-                except (sr.RequestError, RequestException) as e:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay * (attempt + 1))
-                        continue
-                    raise Exception(f"Could not request results from Speech Recognition service after {max_retries} attempts: {str(e)}")
-
-        # Clean up temporary files
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-
-        if not full_transcript:
+        records = transcribe_media(audio_file_path, language, max_retries=max_retries, retry_delay=retry_delay,
+                                   media_sha256=media_sha256)
+
+        if not records:
             raise Exception("Could not generate transcript from any part of the audio")
 
-        return " ".join(full_transcript)
+        return transcript_text(records)
 
     except Exception as e:
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
         raise Exception(f"Error processing audio file: {str(e)}")
 
 def get_supported_languages():
@@ -0,0 +1,214 @@
+"""Benchmark the script-to-podcast pipeline against the local Murf stand-in.
+
+Runs convert_script_to_podcast (through the Flask test client) over synthetic
+scripts of increasing length and writes lines/sec, TTS requests/sec,
+end-to-end latency and peak RSS (of this process and of its ffmpeg encoders)
+as JSON. Example:
+
+    python -m benchmarks.bench_podcast --sizes 10,100,1000 --latency-ms 300 \\
+        --format mp3 --output bench_results.json --compare previous_results.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import threading
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+from benchmarks.murf_standin import StandinConfig, start_standin
+
+SPEAKERS = ['HOST', 'VOICE 1', 'VOICE 2']
+WORDS = (
+    "today we explore how small teams ship reliable software with careful testing clear ownership "
+    "and steady iteration while keeping customers informed about every important change they notice"
+).split()
+
+def synthetic_script(line_count, seed=0):
+    """Build a 'SPEAKER: text' script with short runs of consecutive lines per speaker."""
+    rng = random.Random(seed)
+    lines = []
+    speaker = SPEAKERS[0]
+    for _ in range(line_count):
+        if rng.random() < 0.4:
+            speaker = rng.choice(SPEAKERS)
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 24)))
+        lines.append(f"{speaker}: {sentence.capitalize()}.")
+    return '\n'.join(lines)
+
+def peak_rss_mb():
+    """Peak resident set size of this process, in MiB."""
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1024 * 1024), 1)
+
+class ChildPeakSampler:
+    """Polls /proc for this process's ffmpeg children and records the largest peak RSS (VmHWM) seen.
+
+    RUSAGE_CHILDREN cannot be used: forked children inherit the parent's
+    RSS, so its ru_maxrss reports the parent's size. Linux only; elsewhere
+    peak() returns None. Encoders that start and exit between two polls are
+    missed, so the value is a lower bound.
+    """
+
+    def __init__(self, interval=0.05, name='ffmpeg'):
+        self.interval = interval
+        self.name = name
+        self.peak_kib = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _children(self):
+        parent = str(os.getpid())
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f'/proc/{pid}/stat', encoding='utf-8') as stat_file:
+                    # pid (comm) state ppid ...; comm may contain spaces
+                    comm, rest = stat_file.read().rsplit(')', 1)
+                if rest.split()[1] == parent and self.name in comm:
+                    yield pid
+            except (OSError, IndexError, ValueError):
+                continue
+
+    def _sample(self):
+        for pid in self._children():
+            try:
+                with open(f'/proc/{pid}/status', encoding='utf-8') as status_file:
+                    for line in status_file:
+                        if line.startswith('VmHWM:'):
+                            self.peak_kib = max(self.peak_kib or 0, int(line.split()[1]))
+                            break
+            except (OSError, ValueError):
+                continue
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if os.path.isdir('/proc'):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def peak(self):
+        return None if self.peak_kib is None else round(self.peak_kib / 1024, 1)
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def run_case(client, config, line_count, seed):
+    script = synthetic_script(line_count, seed)
+    requests_before = dict(config.stats)
+    with ChildPeakSampler() as encoder_memory:
+        started = time.perf_counter()
+        response = client.post('/convert_script_to_podcast', data={'script': script})
+        elapsed = time.perf_counter() - started
+    ok = response.status_code == 200 and b'alert-danger' not in response.data
+    tts_requests = config.stats['generate_requests'] - requests_before['generate_requests']
+    return {
+        'lines': line_count,
+        'status': 'ok' if ok else 'error',
+        'elapsed_s': round(elapsed, 3),
+        'lines_per_s': round(line_count / elapsed, 2),
+        'tts_requests_per_s': round(tts_requests / elapsed, 2),
+        'tts_requests': tts_requests,
+        'audio_downloads': config.stats['audio_requests'] - requests_before['audio_requests'],
+        'injected_failures': config.stats['injected_failures'] - requests_before['injected_failures'],
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_ffmpeg_rss_mb': encoder_memory.peak(),
+    }
+
+def compare(results, baseline_path, threshold):
+    """Print cases slower than the baseline by more than threshold; return True if any regressed."""
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = {case['lines']: case for case in json.load(baseline_file)['results']}
+    regressed = False
+    for case in results:
+        previous = baseline.get(case['lines'])
+        if not previous or previous['status'] != 'ok' or case['status'] != 'ok':
+            continue
+        change = (case['elapsed_s'] - previous['elapsed_s']) / previous['elapsed_s']
+        marker = 'REGRESSION' if change > threshold else 'ok'
+        regressed = regressed or change > threshold
+        print(f"{case['lines']:>6} lines: {previous['elapsed_s']:.3f}s -> {case['elapsed_s']:.3f}s ({change:+.1%}) {marker}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,1000', help="comma-separated script line counts")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--format', dest='audio_format', choices=['wav', 'mp3'], default='wav')
+    parser.add_argument('--workers', type=int, default=None, help="TTS_MAX_WORKERS for the run")
+    parser.add_argument('--cache', action='store_true', help="keep the TTS segment cache enabled")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="previous results file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    config = StandinConfig(args.latency_ms, args.jitter_ms, args.failure_rate, args.audio_format, args.seed)
+    server, base_url = start_standin(config)
+    scratch_dir = tempfile.mkdtemp(prefix='podcast_bench_')
+
+    # Configure the app before it is imported: settings are read at import time
+    os.environ.update({
+        'MURF_BASE_URL': base_url,
+        'MURFA_API_KEY': os.getenv('MURFA_API_KEY', 'benchmark'),
+        'TTS_BACKEND': 'murf',
+        'DEPLOYMENT_ENV': 'local',
+        'LOCAL_STORAGE_DIR': scratch_dir,
+        'TTS_CACHE_DIR': os.path.join(scratch_dir, 'tts_cache'),
+        'TTS_RETRY_DELAY': os.getenv('TTS_RETRY_DELAY', '0.1'),
+    })
+    if not args.cache:
+        os.environ['TTS_CACHE_MAX_MB'] = '0'
+    if args.workers:
+        os.environ['TTS_MAX_WORKERS'] = str(args.workers)
+    from app import app
+    app.logger.setLevel('WARNING')
+    client = app.test_client()
+
+    results = []
+    for line_count in [int(size) for size in args.sizes.split(',')]:
+        for run in range(args.repeat):
+            case = run_case(client, config, line_count, args.seed + run)
+            case['run'] = run
+            results.append(case)
+            print(f"{line_count:>6} lines: {case['elapsed_s']:.3f}s, {case['lines_per_s']:.1f} lines/s, "
+                  f"{case['tts_requests']} TTS requests, peak RSS {case['peak_rss_mb']} MiB [{case['status']}]")
+    server.shutdown()
+
+    report = {
+        'benchmark': 'podcast_pipeline',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'python': sys.version.split()[0],
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'tts_max_workers': int(os.getenv('TTS_MAX_WORKERS', '4')),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Local stand-in for the Murf API and its audio CDN, for benchmarking without Murf credits.
+
+Emulates POST /v1/speech/generate (as called by murf.text_to_speech.generate)
+and serves the returned audioFile URLs. Latency, jitter, failure rate and
+payload format are configurable. Run standalone with:
+
+    python -m benchmarks.murf_standin --port 8765 --latency-ms 300 --format mp3
+
+then point the app at it with MURF_BASE_URL=http://127.0.0.1:8765.
+"""
+import io
+import json
+import math
+import time
+import wave
+import array
+import random
+import argparse
+import threading
+from functools import lru_cache
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pydub import AudioSegment
+
+# Spoken duration emulated per character of input text
+MS_PER_CHAR = 55
+SAMPLE_RATE = 24000
+
+class StandinConfig:
+    def __init__(self, latency_ms=200, jitter_ms=50, failure_rate=0.0, audio_format='wav', seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.audio_format = audio_format
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'generate_requests': 0, 'audio_requests': 0, 'injected_failures': 0, 'characters': 0}
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def should_fail(self):
+        with self.lock:
+            failed = self.random.random() < self.failure_rate
+            if failed:
+                self.stats['injected_failures'] += 1
+            return failed
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+@lru_cache(maxsize=256)
+def render_payload(duration_ms, audio_format):
+    """Return a tone of the given duration encoded as WAV or MP3 (cached per duration)."""
+    frames = SAMPLE_RATE * duration_ms // 1000
+    period = array.array('h', (int(6000 * math.sin(2 * math.pi * i / 100)) for i in range(100)))
+    samples = (period.tobytes() * (frames // 100 + 1))[:frames * 2]
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(samples)
+    if audio_format == 'wav':
+        return wav_buffer.getvalue()
+    mp3_buffer = io.BytesIO()
+    AudioSegment(data=samples, sample_width=2, frame_rate=SAMPLE_RATE, channels=1).export(mp3_buffer, format='mp3')
+    return mp3_buffer.getvalue()
+
+def make_handler(config):
+    class MurfStandinHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status, payload):
+            self._send(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip('/') != '/v1/speech/generate':
+                return self._send_json(404, {'errorMessage': 'Not found'})
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            request = json.loads(body or b'{}')
+            text = request.get('text') or ''
+            config.count('generate_requests')
+            config.count('characters', len(text))
+            config.delay()
+            if config.should_fail():
+                return self._send_json(503, {'errorMessage': 'Injected failure'})
+            # Round durations so the payload cache stays small
+            duration_ms = max(200, (len(text) * MS_PER_CHAR) // 100 * 100)
+            host = self.headers.get('Host')
+            self._send_json(200, {
+                'audioFile': f"http://{host}/audio/{duration_ms}.{config.audio_format}?voice={request.get('voiceId', '')}",
+                'audioLengthInSeconds': duration_ms / 1000,
+                'consumedCharacterCount': config.stats['characters'],
+                'remainingCharacterCount': 1_000_000,
+                'wordDurations': [],
+            })
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if not parsed.path.startswith('/audio/'):
+                return self._send_json(404, {'errorMessage': 'Not found'})
+            config.count('audio_requests')
+            config.delay()
+            if config.should_fail():
+                return self._send(503, b'Injected failure', 'text/plain')
+            name = parsed.path.rsplit('/', 1)[-1]
+            duration, _, audio_format = name.partition('.')
+            payload = render_payload(int(duration), audio_format)
+            self._send(200, payload, 'audio/mpeg' if audio_format == 'mp3' else 'audio/wav')
+
+    return MurfStandinHandler
+
+def start_standin(config, host='127.0.0.1', port=0):
+    """Start the stand-in server on a background thread and return (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--format', dest='audio_format', choices=['wav', 'mp3'], default='wav')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    config = StandinConfig(args.latency_ms, args.jitter_ms, args.failure_rate, args.audio_format, args.seed)
+    server, base_url = start_standin(config, args.host, args.port)
+    print(f"Murf stand-in listening on {base_url} (set MURF_BASE_URL={base_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,17 @@
-import google.generativeai as genai
+from gemini_registry import get_model
+from text_chunker import estimate_tokens, split_text
 from typing import Dict, Optional
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from google.cloud import storage
 
+# Scripts estimated above this many tokens are condensed section by section before the post is written
+BLOG_INPUT_MAX_TOKENS = int(os.getenv("BLOG_INPUT_MAX_TOKENS", "30000"))
+# Estimated tokens per condensed section, and sections condensed concurrently
+BLOG_SECTION_TOKENS = int(os.getenv("BLOG_SECTION_TOKENS", "6000"))
+BLOG_CONDENSE_WORKERS = int(os.getenv("BLOG_CONDENSE_WORKERS", "4"))
+
 class BlogGenerator:
     def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None):
         # Load from environment if not provided
@@ -11,8 +19,8 @@ class BlogGenerator:
         self.model_name = model_name or os.getenv("GOOGLE_MODEL", "models/gemini-2.0-flash")
         if not self.api_key:
             raise ValueError("Gemini API key not found. Set GEMINI_API_KEY in your .env file.")
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(self.model_name)
+        # Shared handle: the SDK is configured once per process, not per request
+        self.model = get_model(self.model_name, api_key=self.api_key)
 
     def _get_prompt_template(self, style: str) -> str:
         templates = {
@@ -58,9 +66,27 @@ class BlogGenerator:
         }
         return templates.get(style, templates['informative'])
 
+    def _condense_section(self, section: str, index: int, total: int) -> str:
+        prompt = (
+            f"Condense part {index + 1} of {total} of the following script into detailed notes for a blog post. "
+            f"Keep every topic, example, figure and name; drop filler and repetition. Only output the notes.\n\n"
+            f"Script:\n{section}"
+        )
+        return self.model.generate_content(prompt).text.strip()
+
+    def _condense_script(self, script: str) -> str:
+        """Fit a long script into one prompt by condensing its sections concurrently; short scripts are returned as is."""
+        if estimate_tokens(script) <= BLOG_INPUT_MAX_TOKENS:
+            return script
+        sections = split_text(script, max_tokens=BLOG_SECTION_TOKENS, overlap_tokens=200)
+        workers = max(1, min(BLOG_CONDENSE_WORKERS, len(sections)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            notes = list(executor.map(self._condense_section, sections, range(len(sections)), [len(sections)] * len(sections)))
+        return "\n\n".join(notes)
+
     def generate_blog_post(self, script: str, style: str = 'informative') -> Dict[str, str]:
         try:
-            prompt = self._get_prompt_template(style).format(script=script)
+            prompt = self._get_prompt_template(style).format(script=self._condense_script(script))
             
             response = self.model.generate_content(prompt)
             
@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+class DiskCache:
+    """Small key/value store in a SQLite file with TTL expiry and size-bounded LRU eviction.
+
+    Values are anything json can encode. SQLite in WAL mode handles locking,
+    so every thread and gunicorn worker on the instance can share one file.
+    Entries older than ttl seconds are treated as misses; when the stored
+    values exceed max_bytes the least recently read ones are deleted.
+    """
+
+    def __init__(self, path, max_bytes, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    def _connection(self):
+        # sqlite3 connections may not be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """Return the stored value, or None when it is missing or expired."""
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def put(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        size = len(encoded.encode('utf-8'))
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, size, now, now),
+            )
+        self.evict()
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix):
+        """Delete every entry whose key starts with prefix."""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM entries WHERE key >= ? AND key < ?", (prefix, prefix + '\uffff'))
+
+    def evict(self):
+        """Drop expired entries, then least recently read ones until the cache fits in max_bytes."""
+        with self._connection() as connection:
+            if self.ttl is not None:
+                connection.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,))
+            total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total_size <= self.max_bytes:
+                return
+            rows = connection.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+            expired = []
+            for key, size in rows:
+                if total_size <= self.max_bytes:
+                    break
+                expired.append((key,))
+                total_size -= size
+            connection.executemany("DELETE FROM entries WHERE key = ?", expired)
+
+    def stats(self):
+        with self._connection() as connection:
+            entries, total_size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'entries': entries, 'bytes': total_size, 'max_bytes': self.max_bytes}
@@ -1,7 +1,13 @@
 import os
+from contextlib import contextmanager
 from google.cloud import storage
 
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "startup-consulting")
+DEPLOYMENT_ENV = os.getenv("DEPLOYMENT_ENV", "local")
+# Root directory for the local storage backend (DEPLOYMENT_ENV=local)
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "output_audio")
+# Resumable upload chunk size; must be a multiple of 256 KiB
+GCS_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
 
 def upload_to_gcs(local_file_path, destination_blob_name):
     storage_client = storage.Client()
@@ -15,4 +21,34 @@ def generate_gcs_signed_url(blob_name, expiration=3600):
     bucket = storage_client.bucket(GCS_BUCKET_NAME)
     blob = bucket.blob(blob_name)
     url = blob.generate_signed_url(expiration=expiration)
-    return url 
\ No newline at end of file
+    return url
+
+def local_blob_path(blob_name):
+    return os.path.join(LOCAL_STORAGE_DIR, *blob_name.split('/'))
+
+@contextmanager
+def upload_stream(destination_blob_name, content_type=None):
+    """Open a writable stream for an object in the configured storage backend.
+
+    In the cloud this is a chunked resumable GCS upload, so the object is never
+    materialized on local disk; locally it writes under LOCAL_STORAGE_DIR. The
+    object is only committed if the block exits without an exception.
+    """
+    if DEPLOYMENT_ENV == "cloud":
+        storage_client = storage.Client()
+        blob = storage_client.bucket(GCS_BUCKET_NAME).blob(destination_blob_name)
+        writer = blob.open("wb", chunk_size=GCS_UPLOAD_CHUNK_SIZE, ignore_flush=True, content_type=content_type)
+        # On error the writer is left unclosed so the resumable session is
+        # abandoned instead of finalizing a partial object.
+        yield writer
+        writer.close()
+    else:
+        local_path = local_blob_path(destination_blob_name)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        try:
+            with open(local_path, 'wb') as writer:
+                yield writer
+        except BaseException:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            raise
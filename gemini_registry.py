@@ -0,0 +1,153 @@
+import os
+import json
+import logging
+import threading
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import llm_cache
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_WARM_UP = os.getenv("GEMINI_WARM_UP", "1") == "1"
+
+# Errors meaning "this model is not available to us", as opposed to a bad prompt or a transient failure
+MODEL_UNAVAILABLE_ERRORS = (google_exceptions.NotFound, google_exceptions.PermissionDenied)
+
+_lock = threading.Lock()
+_configured_key = None
+_models = {}
+_handles = {}
+# Requested model name -> fallback that actually served requests in this process
+_substitutes = {}
+
+def configure_gemini(api_key=None):
+    """Configure the Gemini SDK once per process; later calls with the same key are free.
+
+    genai.configure drops the SDK's cached clients, so calling it per request
+    also throws away the open connection to the API.
+    """
+    global _configured_key
+    api_key = api_key or GEMINI_API_KEY or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("Gemini API Key is not configured.")
+    with _lock:
+        if _configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+            _models.clear()
+
+def _config_key(generation_config):
+    if generation_config is None:
+        return None
+    return json.dumps(generation_config, sort_keys=True) if isinstance(generation_config, dict) else repr(generation_config)
+
+def _generative_model(model_name, generation_config=None):
+    key = (model_name, _config_key(generation_config))
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name, generation_config=generation_config)
+            _models[key] = model
+        return model
+
+def resolve_model_name(model_name):
+    """The model that serves requests for model_name: itself, or the fallback recorded for it."""
+    return _substitutes.get(model_name, model_name)
+
+class ModelHandle:
+    """Shared stand-in for genai.GenerativeModel with an optional fallback model.
+
+    generate_content goes to the requested model unless a fallback has
+    already been recorded for it. When the requested model is unavailable
+    the call is retried on fallback_model_name and the substitution is
+    remembered, so later requests go straight to the model that works.
+    Responses are served from and saved to the shared LLM response cache
+    (see llm_cache); pass cache=False to always ask the model.
+    """
+
+    def __init__(self, model_name, generation_config=None, fallback_model_name=None):
+        self.requested_model_name = model_name
+        self.generation_config = generation_config
+        self.fallback_model_name = fallback_model_name
+
+    @property
+    def model_name(self):
+        return resolve_model_name(self.requested_model_name)
+
+    def _effective_config(self, generation_config):
+        """Handle config overridden by the per-call one, as the SDK merges them."""
+        if not all(isinstance(part, (dict, type(None))) for part in (self.generation_config, generation_config)):
+            return [_config_key(self.generation_config), _config_key(generation_config)]
+        config = dict(self.generation_config or {})
+        config.update(generation_config or {})
+        return config
+
+    def generate_content(self, contents, cache=True, **kwargs):
+        cacheable = cache and not kwargs.get('stream')
+        config = self._effective_config(kwargs.get('generation_config'))
+        model_name = self.model_name
+        if cacheable:
+            cached = llm_cache.lookup(model_name, config, contents)
+            if cached is not None:
+                return cached
+        try:
+            response = _generative_model(model_name, self.generation_config).generate_content(contents, **kwargs)
+        except MODEL_UNAVAILABLE_ERRORS as e:
+            fallback = self.fallback_model_name
+            if not fallback or model_name == fallback:
+                raise
+            logger.warning(f"Gemini model '{model_name}' is unavailable ({e}); using fallback model '{fallback}'")
+            _substitutes[self.requested_model_name] = fallback
+            model_name = fallback
+            if cacheable:
+                cached = llm_cache.lookup(model_name, config, contents)
+                if cached is not None:
+                    return cached
+            response = _generative_model(model_name, self.generation_config).generate_content(contents, **kwargs)
+        if cacheable:
+            llm_cache.store(model_name, config, contents, response)
+        return response
+
+    def count_tokens(self, *args, **kwargs):
+        return _generative_model(self.model_name, self.generation_config).count_tokens(*args, **kwargs)
+
+def get_model(model_name, generation_config=None, fallback_model_name=None, api_key=None):
+    """Return the process-wide handle for (model_name, generation_config, fallback), configuring the SDK if needed."""
+    configure_gemini(api_key)
+    key = (model_name, _config_key(generation_config), fallback_model_name)
+    with _lock:
+        handle = _handles.get(key)
+        if handle is None:
+            handle = ModelHandle(model_name, generation_config, fallback_model_name)
+            _handles[key] = handle
+        return handle
+
+def warm_up_model_names():
+    """Models warmed at start-up: GEMINI_WARM_UP_MODELS (comma separated), else GOOGLE_MODEL.
+
+    Read when warming rather than at import, after app.py has loaded .env.
+    """
+    names = os.getenv("GEMINI_WARM_UP_MODELS") or os.getenv("GOOGLE_MODEL", "gemini-2.0-flash")
+    return [name.strip() for name in names.split(",") if name.strip()]
+
+def warm_up(model_names=None, api_key=None):
+    """Configure the SDK and open the API connection for model_names with a cheap token-count call.
+
+    Models that turn out to be missing are logged here, at start-up, instead
+    of failing the first user request.
+    """
+    for model_name in model_names or warm_up_model_names():
+        try:
+            get_model(model_name, api_key=api_key).count_tokens("warm-up")
+            logger.info(f"Gemini model '{model_name}' is ready")
+        except Exception as e:
+            logger.warning(f"Could not warm up Gemini model '{model_name}': {e}")
+
+def start_warm_up(model_names=None, api_key=None):
+    """Run warm_up on a background thread so worker start-up is not delayed."""
+    if not GEMINI_WARM_UP or not (api_key or os.getenv("GEMINI_API_KEY")):
+        return None
+    thread = threading.Thread(target=warm_up, args=(model_names, api_key), name='gemini-warm-up', daemon=True)
+    thread.start()
+    return thread
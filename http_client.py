@@ -0,0 +1,59 @@
+import os
+import tempfile
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+
+HTTP_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+# Bytes read from the socket per iteration when streaming response bodies
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Downloads up to this size stay in memory; larger ones spill to a temp file
+DOWNLOAD_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_http_session():
+    """Return the process-wide keep-alive session used for audio downloads.
+
+    Connections (and their TLS sessions) are pooled per host and reused across
+    segments, threads and requests. Idempotent requests are retried with
+    exponential backoff on connection errors, 429 and 5xx responses.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=HTTP_MAX_RETRIES,
+                backoff_factor=HTTP_BACKOFF_FACTOR,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+def download_to_spooled_file(url):
+    """Stream a URL's body into a seekable spooled file and return it positioned at the start."""
+    with get_http_session().get(url, stream=True, timeout=HTTP_TIMEOUT) as response:
+        response.raise_for_status()
+        spooled_file = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_SIZE)
+        try:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                spooled_file.write(chunk)
+        except Exception:
+            spooled_file.close()
+            raise
+    spooled_file.seek(0)
+    return spooled_file
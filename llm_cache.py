@@ -0,0 +1,132 @@
+import os
+import json
+import unicodedata
+import hashlib
+import tempfile
+import threading
+from disk_cache import DiskCache
+
+# Gemini responses keyed by model, generation config and normalized prompt, shared by every worker
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(tempfile.gettempdir(), "llm_cache.sqlite3"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "128"))
+# Cached responses are regenerated after this many seconds (default one week)
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# '1' sends every prompt to Gemini without reading or writing the cache
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0") == "1"
+
+class CachedPart:
+    def __init__(self, text):
+        self.text = text
+
+class CachedResponse:
+    """Replayed generate_content result exposing the .text and .parts callers read."""
+
+    from_cache = True
+
+    def __init__(self, text):
+        self.text = text
+        self.parts = [CachedPart(text)]
+
+def normalize_prompt(prompt):
+    """Canonical prompt text, so prompts differing only in line endings, trailing spaces or Unicode form share an entry."""
+    if not isinstance(prompt, str):
+        return json.dumps(prompt, sort_keys=True, default=str, ensure_ascii=False)
+    prompt = unicodedata.normalize('NFC', prompt).strip()
+    return "\n".join(line.rstrip() for line in prompt.splitlines())
+
+def prompt_cache_key(model_name, generation_config, prompt):
+    digest = hashlib.sha256()
+    for part in (model_name, json.dumps(generation_config, sort_keys=True, default=str), normalize_prompt(prompt)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return f"llm:{digest.hexdigest()}"
+
+def response_text(response):
+    """Text of a Gemini response, or None when it has none (e.g. blocked by safety filters)."""
+    try:
+        if getattr(response, 'parts', None):
+            return "".join(part.text for part in response.parts if hasattr(part, 'text'))
+        return response.text
+    except (ValueError, AttributeError):
+        return None
+
+class LLMCacheMetrics:
+    """Hit/miss counters for this process; entries and bytes stored are shared by every worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bytes_saved = 0
+
+    def record_hit(self, text):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(text.encode('utf-8'))
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def record_store(self):
+        with self._lock:
+            self.stores += 1
+
+    def to_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'stores': self.stores,
+            }
+
+llm_cache_metrics = LLMCacheMetrics()
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """Return the process-wide LLM response cache, or None when it is disabled or bypassed."""
+    global _llm_cache
+    if LLM_CACHE_BYPASS or LLM_CACHE_MAX_MB <= 0:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = DiskCache(LLM_CACHE_PATH, LLM_CACHE_MAX_MB * 1024 * 1024, ttl=LLM_CACHE_TTL)
+        return _llm_cache
+
+def lookup(model_name, generation_config, prompt):
+    """Return a CachedResponse for the prompt, or None on a miss (or when caching is off)."""
+    cache = get_llm_cache()
+    if cache is None:
+        return None
+    cached = cache.get(prompt_cache_key(model_name, generation_config, prompt))
+    if cached is None:
+        llm_cache_metrics.record_miss()
+        return None
+    llm_cache_metrics.record_hit(cached['text'])
+    return CachedResponse(cached['text'])
+
+def store(model_name, generation_config, prompt, response):
+    """Cache a response that produced text; empty or blocked responses are never stored."""
+    cache = get_llm_cache()
+    if cache is None:
+        return
+    text = response_text(response)
+    if not text or not text.strip():
+        return
+    cache.put(prompt_cache_key(model_name, generation_config, prompt), {'model': model_name, 'text': text})
+    llm_cache_metrics.record_store()
+
+def cache_metrics():
+    """Metrics for the /metrics/llm_cache endpoint."""
+    cache = get_llm_cache()
+    metrics = llm_cache_metrics.to_dict()
+    metrics['enabled'] = cache is not None
+    if cache is not None:
+        metrics.update({f"store_{name}": value for name, value in cache.stats().items()})
+    return metrics
@@ -0,0 +1,179 @@
+import re
+import uuid
+import logging
+from gcs_utils import upload_stream
+from tts_backends import get_tts_backend
+from tts_pipeline import synthesize_segments, TTS_MAX_WORKERS
+from tts_cache import get_segment_cache
+from segment_planner import plan_segments
+from audio_assembly import assemble_segments
+from audio_export import encode_mp3_stream, ProgressiveMP3Encoder
+
+logger = logging.getLogger(__name__)
+
+def detect_language(text):
+    """Detect if the text is primarily Korean or English."""
+    # Count Korean characters (Hangul)
+    korean_chars = len(re.findall(r'[가-힣]', text))
+    # Count English characters
+    english_chars = len(re.findall(r'[a-zA-Z]', text))
+
+    # If there are more Korean characters than English, consider it Korean
+    return 'ko' if korean_chars > english_chars else 'en'
+
+def parse_script(script_text, logger=logger):
+    """Parses the input script into a list of {'speaker': ..., 'text': ...} dictionaries.
+
+    Only 'SPEAKER: text' lines are kept; lines without a speaker are skipped.
+    """
+    lines = script_text.strip().split('\n')
+    parsed_script = []
+    for line in lines:
+        line = line.strip()
+        if ':' in line:
+            parts = line.split(':', 1)
+            speaker = parts[0].strip()
+            text = parts[1].strip()
+            if speaker and text:
+                parsed_script.append({'speaker': speaker, 'text': text})
+        elif line:
+            logger.info(f"Skipping line without speaker: {line}")
+    return parsed_script
+
+def get_voice_config(speaker_name, output_language='en', logger=logger):
+    speaker_name_upper = speaker_name.upper()
+    if output_language == 'ko':
+        if speaker_name_upper == "HOST":
+            return "ko-KR-jong-su"  # Male voice for HOST
+        else:
+            return "ko-KR-jangmi"   # Female voice for others
+    else:
+        if speaker_name_upper == "HOST":
+            return "en-US-ryan"
+        elif speaker_name_upper == "VOICE 1":
+            return "en-US-natalie"
+        elif speaker_name_upper == "VOICE 2":
+            return "en-US-natalie"
+        else:
+            logger.warning(f"Speaker '{speaker_name}' not recognized, using default voice.")
+            return "en-US-natalie"
+
+class PodcastRenderer:
+    """Script-to-audio engine shared by every podcast route and background job.
+
+    Runs parse -> voice resolution -> segment planning -> concurrent TTS (through a pluggable
+    TTSBackend and the segment cache) -> single-pass assembly -> streamed MP3
+    upload, and returns the stored audio filename.
+    """
+
+    def __init__(self, backend=None, cache=None, logger=logger, max_workers=TTS_MAX_WORKERS,
+                 filename_prefix='podcast_audio'):
+        self.backend = backend or get_tts_backend()
+        self.cache = cache if cache is not None else get_segment_cache()
+        self.logger = logger
+        self.max_workers = max_workers
+        self.filename_prefix = filename_prefix
+
+    def is_cached(self, voice_id, text):
+        """Whether audio for exactly this text and voice is in the segment cache."""
+        return self.cache is not None and self.cache.contains(self.cache.make_key(voice_id, text, backend=self.backend.name))
+
+    def plan(self, script_text):
+        """Parse the script, resolve a voice for every line and batch lines into TTS requests."""
+        parsed_script = parse_script(script_text, logger=self.logger)
+        if not parsed_script:
+            raise ValueError("Could not parse the script. Ensure 'SPEAKER: Text' format.")
+
+        # Detect language from the first non-empty text segment
+        output_language = 'en'  # default
+        for item in parsed_script:
+            if item['text'].strip():
+                output_language = detect_language(item['text'])
+                self.logger.info(f"Detected language: {output_language}")
+                break
+
+        self.logger.info(f"Parsed script for podcast: {parsed_script}")
+        lines = [
+            {**item, 'voice_id': get_voice_config(item['speaker'], output_language=output_language, logger=self.logger)}
+            for item in parsed_script
+        ]
+        segments = plan_segments(lines, is_cached=self.is_cached)
+        self.logger.info(f"Planned {len(segments)} TTS requests for {len(lines)} script lines")
+        return segments
+
+    def synthesize(self, segments, progress=None, on_audio_ready=None):
+        audio_segments = synthesize_segments(self.backend, segments, self.logger, max_workers=self.max_workers,
+                                             cache=self.cache,
+                                             on_segment_done=progress.segment_done if progress else None,
+                                             on_audio_ready=on_audio_ready)
+        if not audio_segments:
+            raise ValueError("No audio segments generated.")
+        return audio_segments
+
+    def _new_blob(self):
+        unique_filename = f"{self.filename_prefix}_{uuid.uuid4().hex}.mp3"
+        return unique_filename, f"audio/{unique_filename}"
+
+    def store(self, combined_audio):
+        """Encode the episode to MP3 straight into storage and return its filename."""
+        unique_filename, blob_name = self._new_blob()
+        self.logger.info(f"Streaming combined podcast audio to storage as {blob_name}")
+        with upload_stream(blob_name, content_type="audio/mpeg") as output_stream:
+            encode_mp3_stream(combined_audio, output_stream)
+        return unique_filename
+
+    def render(self, script_text, progress=None, stream_path=None):
+        """Render a script and return the stored audio filename.
+
+        progress, if given, is a RenderJob (or anything with update/segment_done)
+        that receives stage and per-segment updates. With stream_path the
+        episode is rendered progressively (see render_progressive). Raises
+        ValueError for scripts that produce no audio.
+        """
+        if progress:
+            progress.update(stage='parsing')
+        segments = self.plan(script_text)
+
+        if progress:
+            progress.update(stage='synthesizing', segments_total=len(segments))
+        self.logger.info(f"Rendering {len(segments)} segments with the '{self.backend.name}' TTS backend")
+        if stream_path:
+            return self.render_progressive(segments, stream_path, progress)
+        audio_segments = self.synthesize(segments, progress)
+
+        if progress:
+            progress.update(stage='assembling')
+        combined_audio = assemble_segments(audio_segments)
+
+        if progress:
+            progress.update(stage='uploading')
+        return self.store(combined_audio)
+
+    def render_progressive(self, segments, stream_path, progress=None):
+        """Encode leading segments as soon as they are ready instead of after the whole episode.
+
+        One MP3 encoder is fed each segment in script order the moment it and
+        every segment before it have been synthesized. Its output goes both to
+        storage and to stream_path, a growing file that can be served to a
+        player while the rest of the episode is still rendering, so time to
+        first audio no longer depends on episode length.
+        """
+        unique_filename, blob_name = self._new_blob()
+        self.logger.info(f"Progressively rendering podcast audio to {stream_path} and storage as {blob_name}")
+        with upload_stream(blob_name, content_type="audio/mpeg") as output_stream, open(stream_path, 'ab') as stream_file:
+            encoder = ProgressiveMP3Encoder([output_stream, stream_file])
+
+            def on_audio_ready(index, audio):
+                encoder.write(audio)
+                if progress and index == 0:
+                    progress.update(stream_ready=True)
+
+            try:
+                self.synthesize(segments, progress, on_audio_ready=on_audio_ready)
+            except Exception:
+                encoder.abort()
+                raise
+            if progress:
+                progress.update(stage='uploading')
+            encoder.close()
+        return unique_filename
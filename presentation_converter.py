@@ -1,45 +1,91 @@
 import os
-import io
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, render_template, request, current_app
-import google.generativeai as genai
+from gemini_registry import get_model
 from pptx import Presentation
 import PyPDF2
+from upload_ingest import ingest_upload, check_request_size, UploadTooLarge, DOCUMENT_UPLOAD_MAX_MB
+from text_chunker import split_text, SLIDE_SEPARATOR
 
 # Ensure GEMINI_API_KEY is loaded. genai should be configured in app.py
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Chunk prompts sent to Gemini concurrently for one presentation
+SCRIPT_GENERATION_WORKERS = int(os.getenv("SCRIPT_GENERATION_WORKERS", "4"))
+# Estimated input tokens per chunk prompt, and how many of them repeat the end of the previous chunk
+SCRIPT_CHUNK_TOKENS = int(os.getenv("SCRIPT_CHUNK_TOKENS", "1500"))
+SCRIPT_CHUNK_OVERLAP_TOKENS = int(os.getenv("SCRIPT_CHUNK_OVERLAP_TOKENS", "250"))
 
 presentation_bp = Blueprint('presentation_bp', __name__, template_folder='../templates')
 
-def extract_text_from_pptx(pptx_file_stream):
-    """Extracts all text from a .pptx file stream."""
+def extract_text_from_pptx(pptx_file):
+    """Extracts all text from a .pptx file (path or file stream); slides are separated by SLIDE_SEPARATOR."""
     try:
-        prs = Presentation(pptx_file_stream)
-        text_runs = []
+        prs = Presentation(pptx_file)
+        slide_texts = []
         for slide in prs.slides:
+            text_runs = []
             for shape in slide.shapes:
                 if not shape.has_text_frame:
                     continue
                 for paragraph in shape.text_frame.paragraphs:
                     for run in paragraph.runs:
                         text_runs.append(run.text)
-        return "\n".join(text_runs)
+            slide_texts.append("\n".join(text_runs))
+        return f"\n{SLIDE_SEPARATOR}\n".join(slide_texts)
     except Exception as e:
         current_app.logger.error(f"Error extracting text from PPTX: {e}")
         raise ValueError(f"Could not extract text from presentation: {e}")
 
-def extract_text_from_pdf(pdf_file_stream):
-    """Extracts all text from a PDF file stream."""
+def extract_text_from_pdf(pdf_file):
+    """Extracts all text from a PDF file (path or file stream); pages are separated by SLIDE_SEPARATOR."""
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file_stream)
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
         text = []
         for page_num in range(len(pdf_reader.pages)):
             page = pdf_reader.pages[page_num]
             text.append(page.extract_text())
-        return "\n".join(text)
+        return f"\n{SLIDE_SEPARATOR}\n".join(text)
     except Exception as e:
         current_app.logger.error(f"Error extracting text from PDF: {e}")
         raise ValueError(f"Could not extract text from PDF: {e}")
 
+def generate_chunk_script(model, chunk_prompt, index, total, logger, max_retries=2):
+    """Generate the script for one chunk, retrying when Gemini returns an empty response."""
+    try:
+        logger.info(f"Processing chunk {index+1}/{total}. Length: {len(chunk_prompt)}")
+        logger.info(f"Chunk {index+1} prompt (first 500 chars): {chunk_prompt[:500]}")
+
+        # Retry logic for Gemini empty response
+        for attempt in range(max_retries):
+            response = model.generate_content(
+                chunk_prompt,
+                generation_config={
+                    "temperature": 0.7,
+                    "top_p": 0.8,
+                    "top_k": 40,
+                    "max_output_tokens": 2048,
+                }
+            )
+            generated_text = ""
+            if hasattr(response, 'parts') and response.parts:
+                generated_text = "".join(part.text for part in response.parts if hasattr(part, 'text'))
+            elif hasattr(response, 'text') and response.text:
+                generated_text = response.text.strip()
+            if generated_text.strip():
+                logger.info(f"Successfully processed chunk {index+1}/{total}")
+                return generated_text.strip()
+            logger.warning(f"Gemini generated empty text on attempt {attempt+1}. Full response: {response}")
+            if attempt < max_retries - 1:
+                time.sleep(1)
+        raise ValueError("Gemini generated an empty script after retries.")
+
+    except Exception as e:
+        logger.error(f"Error processing chunk {index+1}/{total}: {e}")
+        if "504" in str(e) or "Deadline Exceeded" in str(e):
+            raise ValueError("The request took too long to process. Please try with a shorter text or split it into smaller parts.")
+        raise ValueError(f"Failed to generate script for chunk {index+1}: {str(e)}")
+
 def generate_script_with_gemini(presentation_text, script_style, output_language='en'):
     """Generates script using Google Gemini API with chunking and overlapping content."""
     if not GEMINI_API_KEY:
@@ -54,61 +100,17 @@ def generate_script_with_gemini(presentation_text, script_style, output_language
     primary_model_name = env_model_name if env_model_name else "gemini-1.5-pro"
     fallback_model_name = "gemini-2.0-flash"
 
-    model_name = primary_model_name
+    # Shared handle; switches to the fallback model (once per process) if the primary one is unavailable
     try:
-        model = genai.GenerativeModel(model_name)
-        current_app.logger.info(f"Successfully initialized Gemini model: {model_name}")
+        model = get_model(primary_model_name, fallback_model_name=fallback_model_name, api_key=GEMINI_API_KEY)
+        current_app.logger.info(f"Using Gemini model: {model.model_name}")
     except Exception as e:
-        current_app.logger.error(f"Error initializing Gemini model '{model_name}': {e}")
-        if model_name != fallback_model_name:
-            current_app.logger.info(f"Attempting to use fallback model: {fallback_model_name}")
-            try:
-                model_name = fallback_model_name
-                model = genai.GenerativeModel(model_name)
-                current_app.logger.info(f"Successfully initialized fallback Gemini model: {model_name}")
-            except Exception as fallback_e:
-                current_app.logger.error(f"Error initializing fallback Gemini model '{model_name}': {fallback_e}")
-                raise ValueError(f"Could not initialize Gemini model. Error: {fallback_e}")
-        else:
-            raise ValueError(f"Could not initialize Gemini model '{model_name}'. Error: {e}")
-
-    # Split text into chunks with overlap
-    def split_text_into_chunks_with_overlap(text, chunk_size=6000, overlap_size=1000):
-        if not text or not isinstance(text, str):
-            raise ValueError("Invalid text input for chunking")
-            
-        words = text.split()
-        chunks = []
-        current_chunk = []
-        current_size = 0
-        overlap_words = []
-        
-        for word in words:
-            word_size = len(word) + 1  # +1 for space
-            
-            # If adding this word would exceed chunk size
-            if current_size + word_size > chunk_size:
-                # Save current chunk
-                chunks.append(' '.join(current_chunk))
-                
-                # Keep last few words for overlap
-                overlap_words = current_chunk[-overlap_size//10:]  # Approximate number of words for overlap
-                
-                # Start new chunk with overlap
-                current_chunk = overlap_words + [word]
-                current_size = sum(len(w) + 1 for w in current_chunk)
-            else:
-                current_chunk.append(word)
-                current_size += word_size
-        
-        # Add the last chunk if it's not empty
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        
-        return chunks
+        current_app.logger.error(f"Error initializing Gemini model '{primary_model_name}': {e}")
+        raise ValueError(f"Could not initialize Gemini model '{primary_model_name}'. Error: {e}")
 
     try:
-        chunks = split_text_into_chunks_with_overlap(presentation_text)
+        # Chunks end at slide, paragraph or sentence boundaries and overlap by whole sentences
+        chunks = split_text(presentation_text, max_tokens=SCRIPT_CHUNK_TOKENS, overlap_tokens=SCRIPT_CHUNK_OVERLAP_TOKENS)
         current_app.logger.info(f"Split input into {len(chunks)} chunks with overlap")
     except Exception as e:
         current_app.logger.error(f"Error splitting text into chunks: {e}")
@@ -144,63 +146,40 @@ def generate_script_with_gemini(presentation_text, script_style, output_language
     else:
         raise ValueError("Invalid script style selected.")
 
-    generated_scripts = []
-    
+    total = len(chunks)
+    chunk_prompts = []
     for i, chunk in enumerate(chunks):
-        try:
-            # Add context about chunk position and overlap
-            chunk_context = (
-                f"This is part {i+1} of {len(chunks)} of the presentation content. "
-                f"Some content may overlap with the previous or next part to maintain context. "
-                f"Focus on generating a coherent script for this section while maintaining continuity."
-            )
-            
-            chunk_prompt = (
-                f"{common_prompt_instructions}\n\n"
-                f"{style_specific_instructions}\n\n"
-                f"{chunk_context}\n\n"
-                f"PRESENTATION CONTENT:\n---\n{chunk}\n---\n\n"
-                f"GENERATED SCRIPT:"
-            )
-            
-            current_app.logger.info(f"Processing chunk {i+1}/{len(chunks)}. Length: {len(chunk_prompt)}")
-            current_app.logger.info(f"Chunk {i+1} prompt (first 500 chars): {chunk_prompt[:500]}")
-
-            # Retry logic for Gemini empty response
-            max_retries = 2
-            for attempt in range(max_retries):
-                response = model.generate_content(
-                    chunk_prompt,
-                    generation_config={
-                        "temperature": 0.7,
-                        "top_p": 0.8,
-                        "top_k": 40,
-                        "max_output_tokens": 2048,
-                    }
-                )
-                generated_text = ""
-                if hasattr(response, 'parts') and response.parts:
-                    generated_text = "".join(part.text for part in response.parts if hasattr(part, 'text'))
-                elif hasattr(response, 'text') and response.text:
-                    generated_text = response.text.strip()
-                if generated_text.strip():
-                    generated_scripts.append(generated_text.strip())
-                    break
-                else:
-                    current_app.logger.warning(f"Gemini generated empty text on attempt {attempt+1}. Full response: {response}")
-                    if attempt < max_retries - 1:
-                        import time
-                        time.sleep(1)
-            else:
-                raise ValueError("Gemini generated an empty script after retries.")
-            
-            current_app.logger.info(f"Successfully processed chunk {i+1}/{len(chunks)}")
+        # Add context about chunk position and overlap
+        chunk_context = (
+            f"This is part {i+1} of {total} of the presentation content. "
+            f"Some content may overlap with the previous or next part to maintain context. "
+            f"Focus on generating a coherent script for this section while maintaining continuity."
+        )
+        
+        chunk_prompts.append(
+            f"{common_prompt_instructions}\n\n"
+            f"{style_specific_instructions}\n\n"
+            f"{chunk_context}\n\n"
+            f"PRESENTATION CONTENT:\n---\n{chunk}\n---\n\n"
+            f"GENERATED SCRIPT:"
+        )
 
-        except Exception as e:
-            current_app.logger.error(f"Error processing chunk {i+1}/{len(chunks)}: {e}")
-            if "504" in str(e) or "Deadline Exceeded" in str(e):
-                raise ValueError("The request took too long to process. Please try with a shorter text or split it into smaller parts.")
-            raise ValueError(f"Failed to generate script for chunk {i+1}: {str(e)}")
+    # Worker threads have no app context, so they get the logger object itself
+    logger = current_app.logger
+    workers = max(1, min(SCRIPT_GENERATION_WORKERS, total))
+    logger.info(f"Generating {total} chunks with up to {workers} concurrent Gemini requests")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(generate_chunk_script, model, chunk_prompt, i, total, logger)
+            for i, chunk_prompt in enumerate(chunk_prompts)
+        ]
+        try:
+            # Reassemble in slide order regardless of completion order
+            generated_scripts = [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
 
     # Combine all generated scripts with overlap handling
     final_script = []
@@ -226,6 +205,10 @@ def generate_script_with_gemini(presentation_text, script_style, output_language
 @presentation_bp.route('/convert_presentation_to_script', methods=['GET', 'POST'])
 def convert_presentation_to_script():
     if request.method == 'POST':
+        try:
+            check_request_size(DOCUMENT_UPLOAD_MAX_MB)
+        except UploadTooLarge as e:
+            return render_template('convert_presentation.html', error=str(e))
         presentation_text_input = request.form.get('presentation_text_input')
         presentation_file = request.files.get('presentation_file')
         script_style = request.form.get('script_style')
@@ -241,17 +224,17 @@ def convert_presentation_to_script():
             if file_ext not in allowed_extensions:
                 return render_template('convert_presentation.html', error="Invalid file type. Please upload a .pptx, .pdf, .md, or .txt file.", presentation_text_input=presentation_text_input)
             try:
-                file_stream = io.BytesIO(presentation_file.read())
-                if file_ext == 'pptx':
-                    presentation_text = extract_text_from_pptx(file_stream)
-                elif file_ext == 'pdf':
-                    presentation_text = extract_text_from_pdf(file_stream)
-                elif file_ext in {'md', 'txt'}:
-                    file_stream.seek(0)
-                    presentation_text = file_stream.read().decode('utf-8')
-                    current_app.logger.info(f"Extracted text from {file_ext}: {presentation_text}")
-                else:
-                    presentation_text = ''
+                # Parsers read the scratch file directly instead of an in-memory copy of the upload
+                with ingest_upload(presentation_file, DOCUMENT_UPLOAD_MAX_MB, suffix=f".{file_ext}") as upload:
+                    if file_ext == 'pptx':
+                        presentation_text = extract_text_from_pptx(upload.path)
+                    elif file_ext == 'pdf':
+                        presentation_text = extract_text_from_pdf(upload.path)
+                    elif file_ext in {'md', 'txt'}:
+                        presentation_text = upload.read_text()
+                        current_app.logger.info(f"Extracted text from {file_ext}: {presentation_text}")
+                    else:
+                        presentation_text = ''
             except Exception as e:
                 current_app.logger.error(f"Error extracting text from file: {e}")
                 return render_template('convert_presentation.html', error=f"Could not extract text from the presentation: {e}", presentation_text_input=presentation_text_input)
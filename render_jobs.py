@@ -0,0 +1,153 @@
+import os
+import time
+import uuid
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Size of the background render pool, independent of gunicorn's web threads
+PODCAST_RENDER_WORKERS = int(os.getenv("PODCAST_RENDER_WORKERS", "2"))
+# Finished jobs are forgotten after this many seconds
+RENDER_JOB_TTL = int(os.getenv("RENDER_JOB_TTL", "3600"))
+# Growing MP3 files served to listeners while a progressive render is running
+RENDER_STREAM_DIR = os.getenv("RENDER_STREAM_DIR", os.path.join(tempfile.gettempdir(), "podcast_streams"))
+# A finished job's stream file is deleted after this many seconds; the stored MP3 remains the permanent copy
+RENDER_STREAM_RETENTION = int(os.getenv("RENDER_STREAM_RETENTION", "300"))
+# Cap on stream files kept on disk (tmp is memory-backed on Cloud Run); oldest finished streams go first
+RENDER_STREAM_MAX_MB = int(os.getenv("RENDER_STREAM_MAX_MB", "256"))
+
+class RenderJob:
+    """State of one background render, updated by the worker and read by the status endpoint."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.stage = 'queued'
+        self.segments_total = 0
+        self.segments_completed = 0
+        self.result = None
+        self.error = None
+        self.stream_path = None
+        self.stream_ready = False
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.updated_at = time.time()
+
+    def segment_done(self, index=None):
+        with self._lock:
+            self.segments_completed += 1
+            self.updated_at = time.time()
+
+    def stream_size(self):
+        try:
+            return os.path.getsize(self.stream_path) if self.stream_path else 0
+        except OSError:
+            return 0
+
+    def cleanup(self):
+        """Delete the stream file; listeners that already opened it keep reading until they finish."""
+        with self._lock:
+            self.stream_ready = False
+        try:
+            if self.stream_path:
+                os.remove(self.stream_path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'stage': self.stage,
+                'segments_total': self.segments_total,
+                'segments_completed': self.segments_completed,
+                'stream_ready': self.stream_ready,
+                'error': self.error,
+                'created_at': self.created_at,
+                'updated_at': self.updated_at,
+            }
+
+class RenderJobManager:
+    """Runs render pipelines on a bounded thread pool and keeps their status in memory.
+
+    Job state is per process, so status requests must reach the process that
+    accepted the job (the Dockerfile runs a single gunicorn worker).
+    """
+
+    def __init__(self, max_workers=PODCAST_RENDER_WORKERS, job_ttl=RENDER_JOB_TTL,
+                 stream_retention=RENDER_STREAM_RETENTION, stream_max_bytes=RENDER_STREAM_MAX_MB * 1024 * 1024):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='render')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.job_ttl = job_ttl
+        self.stream_retention = stream_retention
+        self.stream_max_bytes = stream_max_bytes
+
+    def submit(self, app, pipeline, *args, stream=False, **kwargs):
+        """Queue pipeline(job, *args, **kwargs) to run inside an app context and return the job.
+
+        With stream=True the job gets a stream_path under RENDER_STREAM_DIR that
+        the pipeline appends encoded audio to while it renders.
+        """
+        job = RenderJob()
+        if stream:
+            os.makedirs(RENDER_STREAM_DIR, exist_ok=True)
+            job.stream_path = os.path.join(RENDER_STREAM_DIR, f"{job.id}.mp3")
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, app, job, pipeline, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, app, job, pipeline, args, kwargs):
+        with app.app_context():
+            job.update(status='running')
+            try:
+                result = pipeline(job, *args, **kwargs)
+                job.update(status='completed', stage='done', result=result)
+            except Exception as e:
+                app.logger.error(f"Render job {job.id} failed: {e}", exc_info=True)
+                job.update(status='failed', error=str(e))
+        if job.stream_path:
+            self._expire_stream(job)
+
+    def _expire_stream(self, job):
+        """Schedule the finished job's stream file for deletion once the playback window has passed."""
+        timer = threading.Timer(self.stream_retention, job.cleanup)
+        timer.daemon = True
+        timer.start()
+        with self._lock:
+            self._enforce_stream_budget()
+
+    def _enforce_stream_budget(self):
+        # Running jobs are never trimmed; finished streams are deleted oldest first
+        streams = [job for job in self._jobs.values() if job.stream_path]
+        total_size = sum(job.stream_size() for job in streams)
+        for job in sorted((job for job in streams if job.finished), key=lambda job: job.updated_at):
+            if total_size <= self.stream_max_bytes:
+                break
+            total_size -= job.stream_size()
+            job.cleanup()
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.updated_at < cutoff]
+        for job_id in expired:
+            self._jobs.pop(job_id).cleanup()
+
+render_job_manager = RenderJobManager()
@@ -0,0 +1,94 @@
+import os
+import re
+import hashlib
+
+# Longest text sent in one TTS request (Murf rejects longer inputs)
+TTS_MAX_SEGMENT_CHARS = int(os.getenv("TTS_MAX_SEGMENT_CHARS", "3000"))
+# Merge consecutive lines of the same speaker into one request
+TTS_MERGE_SAME_VOICE = os.getenv("TTS_MERGE_SAME_VOICE", "1") == "1"
+# Longest merged request; it bounds what one edited line costs to re-synthesize
+TTS_MERGE_MAX_CHARS = int(os.getenv("TTS_MERGE_MAX_CHARS", "1000"))
+# Average number of lines per merged request; block ends are chosen by line content (see ends_block)
+MERGE_BLOCK_LINES = 4
+
+SENTENCE_END = re.compile(r'[.!?。！？…]+["\')\]]*\s+')
+TERMINAL_PUNCTUATION = re.compile(r'[.!?。！？…]["\')\]]*$')
+LINE_SEPARATOR = ' '
+
+def split_text(text, max_chars):
+    """Return (start, end) offsets that cut text into pieces of at most max_chars.
+
+    Cuts fall after the last sentence end inside the window, then at the last
+    whitespace, and only as a last resort in the middle of a word.
+    """
+    pieces = []
+    start = 0
+    while len(text) - start > max_chars:
+        window_end = start + max_chars
+        cut = None
+        for match in SENTENCE_END.finditer(text, start, window_end):
+            cut = match.end()
+        if cut is None or cut <= start:
+            space = text.rfind(' ', start, window_end)
+            cut = space + 1 if space > start else window_end
+        pieces.append((start, len(text[start:cut].rstrip()) + start))
+        start = cut
+    if start < len(text):
+        pieces.append((start, len(text)))
+    return pieces
+
+def terminate_sentence(text):
+    """End text with sentence punctuation so the voice pauses before the next merged line."""
+    if TERMINAL_PUNCTUATION.search(text):
+        return text
+    return text + '.'
+
+def ends_block(text):
+    """Whether a line closes its merged request, decided by its own content.
+
+    Block ends do not depend on the lines before, so editing one line only
+    changes the request that contains it; the other requests keep their
+    exact text and stay cache hits.
+    """
+    return hashlib.sha256(text.encode('utf-8')).digest()[0] < 256 // MERGE_BLOCK_LINES
+
+def plan_segments(lines, max_chars=TTS_MAX_SEGMENT_CHARS, merge_same_voice=TTS_MERGE_SAME_VOICE,
+                  merge_max_chars=TTS_MERGE_MAX_CHARS, is_cached=None):
+    """Group script lines into fewer TTS requests.
+
+    lines is the parsed script with resolved voices ({'speaker', 'text',
+    'voice_id'}). Lines longer than max_chars are split at sentence
+    boundaries. Consecutive lines of the same speaker are joined, each
+    ended with punctuation so the pause between them survives, until a line
+    ends its block (ends_block) or merge_max_chars is reached. Lines for
+    which is_cached(voice_id, text) is true are kept as requests of their
+    own so their cached audio is reused. Every planned segment records in
+    'parts' which slice of which line it carries: (line_index, line_start,
+    line_end, segment_offset), so text[segment_offset:segment_offset +
+    line_end - line_start] equals lines[line_index]['text'][line_start:line_end].
+    """
+    segments = []
+    current = None
+    block_open = False
+    for line_index, line in enumerate(lines):
+        for line_start, line_end in split_text(line['text'], max_chars):
+            piece = line['text'][line_start:line_end]
+            standalone = is_cached is not None and is_cached(line['voice_id'], piece)
+            joined = terminate_sentence(current['text']) + LINE_SEPARATOR if current is not None else ''
+            can_merge = (
+                merge_same_voice
+                and block_open
+                and not standalone
+                and current['speaker'] == line['speaker']
+                and current['voice_id'] == line['voice_id']
+                and len(joined) + len(piece) <= min(max_chars, merge_max_chars)
+            )
+            if can_merge:
+                current['text'] = joined
+            else:
+                current = {'speaker': line['speaker'], 'voice_id': line['voice_id'], 'text': '', 'parts': []}
+                segments.append(current)
+            current['parts'].append((line_index, line_start, line_end, len(current['text'])))
+            current['text'] += piece
+            block_open = not standalone and not ends_block(piece)
+    return segments
@@ -0,0 +1,241 @@
+import os
+import math
+import tempfile
+import subprocess
+from collections import deque
+import speech_recognition as sr
+from pydub.utils import get_encoder_name
+
+try:
+    import audioop
+except ImportError:
+    import pyaudioop as audioop
+
+# Format expected by the speech recognizer: 16 kHz, mono, 16-bit PCM
+SPEECH_SAMPLE_RATE = 16000
+SPEECH_SAMPLE_WIDTH = 2
+BYTES_PER_MS = SPEECH_SAMPLE_RATE * SPEECH_SAMPLE_WIDTH // 1000
+
+# PCM read from the decoder per step; with the largest chunk this bounds memory per transcription
+DECODE_WINDOW_MS = int(os.getenv("DECODE_WINDOW_MS", "10000"))
+# Cut transcription chunks at pauses and skip silence ('0' restores fixed-length chunks)
+TRANSCRIBE_VAD = os.getenv("TRANSCRIBE_VAD", "1") == "1"
+# Shortest quiet stretch treated as a pause between phrases
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "300"))
+VAD_FRAME_MS = 30
+# Voiced stretches shorter than this are clicks or breaths, not speech
+VAD_MIN_SPEECH_MS = 150
+# Audio kept around every phrase so word onsets and tails are not clipped
+VAD_PADDING_MS = 200
+# Frames at or below this RMS are silent whatever the recording's noise floor
+VAD_MIN_RMS = 50
+# Chunks are normalized to this many dB below full scale, like AudioSegment.normalize()
+NORMALIZE_HEADROOM_DB = 0.1
+
+def decode_speech_pcm(media_file_path, window_ms=DECODE_WINDOW_MS):
+    """Decode any audio or video file with ffmpeg and yield 16 kHz mono 16-bit PCM in window_ms blocks.
+
+    Only the audio stream is decoded and resampled, and at most one window
+    is held here at a time, so memory does not grow with the file's length.
+    """
+    command = [
+        get_encoder_name(), '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', media_file_path, '-vn',
+        '-ac', '1', '-ar', str(SPEECH_SAMPLE_RATE), '-f', 's16le', 'pipe:1',
+    ]
+    window_bytes = max(1, window_ms) * BYTES_PER_MS
+    # stderr goes to a file so a chatty decoder can never block on a full pipe
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+        try:
+            while True:
+                window = process.stdout.read(window_bytes)
+                if not window:
+                    break
+                yield window
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        if process.returncode != 0:
+            stderr_file.seek(0)
+            error = stderr_file.read().decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"Could not decode audio (ffmpeg exit {process.returncode}): {error}")
+
+def normalize_pcm(frame_data, headroom_db=NORMALIZE_HEADROOM_DB):
+    """Scale a chunk of 16-bit PCM so its peak sits headroom_db below full scale."""
+    peak = audioop.max(frame_data, SPEECH_SAMPLE_WIDTH)
+    if not peak:
+        return frame_data
+    target = (2 ** (8 * SPEECH_SAMPLE_WIDTH - 1) - 1) * 10 ** (-headroom_db / 20)
+    return audioop.mul(frame_data, SPEECH_SAMPLE_WIDTH, target / peak)
+
+def to_audio_data(frame_data):
+    return sr.AudioData(normalize_pcm(frame_data), SPEECH_SAMPLE_RATE, SPEECH_SAMPLE_WIDTH)
+
+def iter_fixed_chunks(pcm_windows, chunk_length_ms=30000):
+    """Regroup streamed PCM into consecutive chunk_length_ms chunks of (start_ms, end_ms, frame_data)."""
+    chunk_bytes = chunk_length_ms * BYTES_PER_MS
+    buffer = bytearray()
+    start_ms = 0
+    for window in pcm_windows:
+        buffer += window
+        while len(buffer) >= chunk_bytes:
+            yield start_ms, start_ms + chunk_length_ms, bytes(buffer[:chunk_bytes])
+            del buffer[:chunk_bytes]
+            start_ms += chunk_length_ms
+    if len(buffer) >= BYTES_PER_MS:
+        yield start_ms, start_ms + len(buffer) // BYTES_PER_MS, bytes(buffer)
+
+class SpeechSegmenter:
+    """Incremental energy-based voice activity segmenter.
+
+    PCM is fed in arbitrary blocks and split into VAD_FRAME_MS frames. A frame
+    is voiced when its RMS is above a threshold derived from the noise floor
+    and speech level of the audio seen so far (tracked in a fixed-size
+    decibel histogram). Voiced frames form phrases, padded by VAD_PADDING_MS;
+    silences longer than min_silence_ms are dropped, and the phrases around
+    them are packed into chunks of at most max_chunk_ms. A phrase longer than max_chunk_ms is cut at its quietest
+    frame inside the window rather than at a fixed offset. Only the chunk
+    being built is held in memory.
+    """
+
+    frame_bytes = VAD_FRAME_MS * BYTES_PER_MS
+
+    def __init__(self, max_chunk_ms=30000, min_silence_ms=VAD_MIN_SILENCE_MS):
+        self.max_frames = max(2, max_chunk_ms // VAD_FRAME_MS)
+        self.padding_frames = VAD_PADDING_MS // VAD_FRAME_MS
+        self.min_speech_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+        # Trailing silence that still belongs to the phrase: its padding, a pause, the next phrase's padding
+        self.max_gap_frames = min_silence_ms // VAD_FRAME_MS + 2 * self.padding_frames
+        self.threshold = VAD_MIN_RMS
+        # Frame counts per 1 dB of RMS energy
+        self._histogram = [0] * 100
+        self._partial = b''
+        self._frame_index = 0
+        self._lookback = deque(maxlen=self.padding_frames)
+        # Current phrase: start frame, [(frame, energy, voiced)], trailing silent frames
+        self._phrase_start = None
+        self._phrase = []
+        self._silent_run = 0
+        # Chunk being packed: [(start_frame, end_frame, frames)], total frames
+        self._chunk = []
+        self._chunk_frames = 0
+
+    def _percentile(self, fraction):
+        rank = fraction * sum(self._histogram)
+        seen = 0
+        for level, count in enumerate(self._histogram):
+            seen += count
+            if seen > rank:
+                return 10 ** (level / 20)
+        return 0
+
+    def _update_threshold(self):
+        noise_floor = self._percentile(0.1)
+        speech_level = self._percentile(0.95)
+        if speech_level < noise_floor * 2:
+            # Under 6 dB of dynamic range: no pauses to tell apart yet, treat all but digital silence as speech
+            self.threshold = VAD_MIN_RMS
+        else:
+            self.threshold = max(VAD_MIN_RMS, noise_floor + (speech_level - noise_floor) * 0.15)
+
+    def feed(self, pcm):
+        """Add a block of PCM and return the chunks completed by it as (start_ms, end_ms, frame_data)."""
+        data = self._partial + bytes(pcm)
+        usable = len(data) - len(data) % self.frame_bytes
+        self._partial = data[usable:]
+        frames = [data[offset:offset + self.frame_bytes] for offset in range(0, usable, self.frame_bytes)]
+        energies = [audioop.rms(frame, SPEECH_SAMPLE_WIDTH) for frame in frames]
+        if not frames:
+            return []
+        for energy in energies:
+            self._histogram[min(len(self._histogram) - 1, int(20 * math.log10(max(energy, 1))))] += 1
+        self._update_threshold()
+        completed = []
+        for frame, energy in zip(frames, energies):
+            self._add_frame(frame, energy, completed)
+            self._frame_index += 1
+        return completed
+
+    def flush(self):
+        """Close the open phrase and return the remaining chunks."""
+        completed = []
+        if self._phrase:
+            self._close_phrase(completed, keep=len(self._phrase) - max(0, self._silent_run - self.padding_frames))
+        self._emit_chunk(completed)
+        return completed
+
+    def _add_frame(self, frame, energy, completed):
+        voiced = energy > self.threshold
+        if not self._phrase:
+            if not voiced:
+                self._lookback.append(frame)
+                return
+            lead = list(self._lookback)
+            self._lookback.clear()
+            self._phrase_start = self._frame_index - len(lead)
+            self._phrase = [(lead_frame, 0, False) for lead_frame in lead]
+            self._silent_run = 0
+        self._phrase.append((frame, energy, voiced))
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run > self.max_gap_frames:
+            # Pause is long enough to drop: keep the tail padding, remember the next lead-in
+            keep = len(self._phrase) - self._silent_run + self.padding_frames
+            self._lookback.extend(frame for frame, _, _ in self._phrase[-self.padding_frames:])
+            self._close_phrase(completed, keep)
+        elif len(self._phrase) >= self.max_frames:
+            window = self._phrase[len(self._phrase) // 2:]
+            cut = len(self._phrase) // 2 + min(range(len(window)), key=lambda index: window[index][1])
+            self._add_piece(self._phrase_start, self._phrase[:cut], completed)
+            self._phrase_start += cut
+            self._phrase = self._phrase[cut:]
+
+    def _close_phrase(self, completed, keep):
+        phrase = self._phrase[:keep]
+        if sum(1 for _, _, voiced in phrase if voiced) >= self.min_speech_frames:
+            self._add_piece(self._phrase_start, phrase, completed)
+        self._phrase = []
+        self._phrase_start = None
+        self._silent_run = 0
+
+    def _add_piece(self, start_frame, phrase, completed):
+        if self._chunk_frames + len(phrase) > self.max_frames:
+            self._emit_chunk(completed)
+        self._chunk.append((start_frame, start_frame + len(phrase), [frame for frame, _, _ in phrase]))
+        self._chunk_frames += len(phrase)
+
+    def _emit_chunk(self, completed):
+        if not self._chunk:
+            return
+        frame_data = b''.join(frame for _, _, frames in self._chunk for frame in frames)
+        completed.append((self._chunk[0][0] * VAD_FRAME_MS, self._chunk[-1][1] * VAD_FRAME_MS, frame_data))
+        self._chunk = []
+        self._chunk_frames = 0
+
+def iter_speech_chunks(pcm_windows, max_chunk_ms=30000, min_silence_ms=VAD_MIN_SILENCE_MS):
+    """Yield (start_ms, end_ms, sr.AudioData) for the speech in a stream of PCM windows.
+
+    Chunks end at pauses rather than mid-word and long silences are dropped,
+    so fewer and smaller requests reach the recognizer. start_ms/end_ms span
+    the source audio a chunk was taken from. Each chunk is peak-normalized on
+    its own. Falls back to fixed max_chunk_ms slices when TRANSCRIBE_VAD is off.
+    """
+    if TRANSCRIBE_VAD:
+        segmenter = SpeechSegmenter(max_chunk_ms, min_silence_ms)
+        chunks = (chunk for window in pcm_windows for chunk in segmenter.feed(window))
+        chunks = _chain_flush(chunks, segmenter)
+    else:
+        chunks = iter_fixed_chunks(pcm_windows, chunk_length_ms=max_chunk_ms)
+    for start_ms, end_ms, frame_data in chunks:
+        yield start_ms, end_ms, to_audio_data(frame_data)
+
+def _chain_flush(chunks, segmenter):
+    yield from chunks
+    yield from segmenter.flush()
+
+def iter_media_speech_chunks(media_file_path, max_chunk_ms=30000):
+    """Stream-decode a media file and yield its speech chunks; see iter_speech_chunks."""
+    return iter_speech_chunks(decode_speech_pcm(media_file_path), max_chunk_ms=max_chunk_ms)
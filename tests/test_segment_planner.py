@@ -0,0 +1,91 @@
+import pytest
+
+from segment_planner import plan_segments, terminate_sentence
+
+SPEAKERS = {'Host': 'voice-host', 'Guest': 'voice-guest'}
+
+def line(speaker, text):
+    return {'speaker': speaker, 'text': text, 'voice_id': SPEAKERS[speaker]}
+
+def script(count=40):
+    speakers = ['Host', 'Host', 'Guest', 'Guest', 'Guest', 'Host']
+    return [line(speakers[index % len(speakers)], f"Line {index} says something about topic {index % 7}")
+            for index in range(count)]
+
+def assert_parts_rebuild_lines(lines, segments):
+    pieces = {index: [] for index in range(len(lines))}
+    for segment in segments:
+        for line_index, line_start, line_end, offset in segment['parts']:
+            piece = lines[line_index]['text'][line_start:line_end]
+            assert segment['text'][offset:offset + len(piece)] == piece
+            pieces[line_index].append((line_start, line_end))
+    # Each line is covered in order, with only whitespace left out between its pieces
+    for line_index, spans in pieces.items():
+        text = lines[line_index]['text']
+        assert spans and spans == sorted(spans)
+        assert spans[0][0] == 0 and text[spans[-1][1]:].strip() == ""
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            assert text[end:start].strip() == ""
+
+def test_merges_only_consecutive_lines_of_one_speaker():
+    lines = script()
+    segments = plan_segments(lines, max_chars=3000, merge_same_voice=True, merge_max_chars=1000)
+    assert len(segments) < len(lines)
+    assert_parts_rebuild_lines(lines, segments)
+    for segment in segments:
+        indexes = [line_index for line_index, _, _, _ in segment['parts']]
+        assert indexes == list(range(indexes[0], indexes[0] + len(indexes)))
+        assert {lines[index]['speaker'] for index in indexes} == {segment['speaker']}
+        assert {lines[index]['voice_id'] for index in indexes} == {segment['voice_id']}
+
+def test_merged_lines_are_joined_with_sentence_punctuation():
+    lines = script()
+    segments = plan_segments(lines, max_chars=3000, merge_same_voice=True, merge_max_chars=1000)
+    merged = [segment for segment in segments if len(segment['parts']) > 1]
+    assert merged
+    for segment in merged:
+        for (index, start, end, offset), (_, _, _, next_offset) in zip(segment['parts'], segment['parts'][1:]):
+            assert segment['text'][offset + end - start:next_offset] == ". "
+
+def test_segments_respect_length_limits():
+    lines = script(60) + [line('Host', "A long sentence that keeps going on. " * 40)]
+    segments = plan_segments(lines, max_chars=300, merge_same_voice=True, merge_max_chars=120)
+    assert_parts_rebuild_lines(lines, segments)
+    for segment in segments:
+        assert len(segment['text']) <= 300
+        if len(segment['parts']) > 1:
+            assert len(segment['text']) <= 120
+
+def test_long_line_is_split_at_sentence_ends():
+    text = " ".join(f"Sentence {index} of a long monologue." for index in range(30))
+    segments = plan_segments([line('Guest', text)], max_chars=200, merge_same_voice=False)
+    assert len(segments) > 1
+    assert all(len(segment['text']) <= 200 and segment['text'].endswith('.') for segment in segments)
+    assert " ".join(segment['text'] for segment in segments) == text
+
+def test_merging_can_be_disabled():
+    lines = script()
+    segments = plan_segments(lines, max_chars=3000, merge_same_voice=False)
+    assert [segment['text'] for segment in segments] == [entry['text'] for entry in lines]
+
+def test_cached_lines_stay_standalone():
+    lines = script()
+    cached = {(lines[index]['voice_id'], lines[index]['text']) for index in (1, 3, 4)}
+    segments = plan_segments(lines, max_chars=3000, merge_same_voice=True, merge_max_chars=1000,
+                             is_cached=lambda voice_id, text: (voice_id, text) in cached)
+    for index in (1, 3, 4):
+        assert {'speaker': lines[index]['speaker'], 'voice_id': lines[index]['voice_id'],
+                'text': lines[index]['text'], 'parts': [(index, 0, len(lines[index]['text']), 0)]} in segments
+
+@pytest.mark.parametrize("edited", [0, 7, 19, 38])
+def test_editing_a_line_changes_at_most_two_requests(edited):
+    lines = script()
+    before = {segment['text'] for segment in plan_segments(lines, 3000, True, 1000)}
+    lines[edited] = dict(lines[edited], text=lines[edited]['text'] + " with an edit")
+    after = [segment['text'] for segment in plan_segments(lines, 3000, True, 1000)]
+    assert len([text for text in after if text not in before]) <= 2
+
+def test_terminate_sentence_keeps_existing_punctuation():
+    assert terminate_sentence("Hello") == "Hello."
+    assert terminate_sentence("Really?") == "Really?"
+    assert terminate_sentence('He said "yes."') == 'He said "yes."'
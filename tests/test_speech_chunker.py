@@ -0,0 +1,76 @@
+import math
+import struct
+
+import pytest
+
+from speech_chunker import BYTES_PER_MS, SPEECH_SAMPLE_RATE, VAD_FRAME_MS, VAD_PADDING_MS, SpeechSegmenter
+
+def tone(ms, amplitude=8000, frequency=440):
+    samples = SPEECH_SAMPLE_RATE * ms // 1000
+    return struct.pack(f"<{samples}h", *(int(amplitude * math.sin(2 * math.pi * frequency * index / SPEECH_SAMPLE_RATE))
+                                          for index in range(samples)))
+
+def silence(ms):
+    return b"\0" * (ms * BYTES_PER_MS)
+
+def segment(pcm, block_bytes=4001, **kwargs):
+    # Odd block size so frames straddle feed() calls
+    segmenter = SpeechSegmenter(**kwargs)
+    chunks = []
+    for offset in range(0, len(pcm), block_bytes):
+        chunks.extend(segmenter.feed(pcm[offset:offset + block_bytes]))
+    return chunks + segmenter.flush()
+
+def build(parts):
+    """PCM for [(kind, ms)] and the (start_ms, end_ms) of its tones."""
+    pcm = b""
+    speech = []
+    for kind, ms in parts:
+        if kind == "tone":
+            speech.append((len(pcm) // BYTES_PER_MS, len(pcm) // BYTES_PER_MS + ms))
+            pcm += tone(ms)
+        else:
+            pcm += silence(ms)
+    return pcm, speech
+
+PHRASES = [("tone", 1000), ("silence", 1000), ("tone", 1200), ("silence", 2000), ("tone", 1500), ("silence", 600)]
+
+def test_chunks_cover_speech_and_drop_silence():
+    pcm, speech = build(PHRASES)
+    chunks = segment(pcm, max_chunk_ms=30000)
+    # A chunk spans the source audio it came from, including the pauses dropped inside it
+    for start_ms, end_ms, frame_data in chunks:
+        assert len(frame_data) <= (end_ms - start_ms) * BYTES_PER_MS
+    for speech_start, speech_end in speech:
+        assert any(start_ms <= speech_start and speech_end <= end_ms for start_ms, end_ms, _ in chunks)
+    kept_ms = sum(len(frame_data) for _, _, frame_data in chunks) // BYTES_PER_MS
+    speech_ms = sum(end - start for start, end in speech)
+    assert speech_ms <= kept_ms <= speech_ms + len(speech) * 2 * (VAD_PADDING_MS + VAD_FRAME_MS)
+
+def test_chunks_are_cut_in_pauses():
+    pcm, speech = build(PHRASES)
+    chunks = segment(pcm, max_chunk_ms=2000)
+    assert len(chunks) == len(speech)
+    for (start_ms, end_ms, frame_data), (speech_start, speech_end) in zip(chunks, speech):
+        assert 0 <= speech_start - start_ms <= VAD_PADDING_MS + VAD_FRAME_MS
+        assert 0 <= end_ms - speech_end <= VAD_PADDING_MS + VAD_FRAME_MS
+        assert len(frame_data) == (end_ms - start_ms) * BYTES_PER_MS
+
+@pytest.mark.parametrize("max_chunk_ms", [1500, 4000, 10000])
+def test_chunks_never_exceed_max_length(max_chunk_ms):
+    pcm, _ = build([("tone", 12000), ("silence", 500), ("tone", 3000)])
+    chunks = segment(pcm, max_chunk_ms=max_chunk_ms)
+    assert all(end_ms - start_ms <= max_chunk_ms for start_ms, end_ms, _ in chunks)
+    assert sum(len(frame_data) for _, _, frame_data in chunks) // BYTES_PER_MS >= 15000
+
+def test_long_phrase_is_cut_at_its_quietest_frame():
+    # A dip too short to be a pause still beats cutting at the chunk limit
+    pcm, _ = build([("tone", 2700), ("silence", 90), ("tone", 3000)])
+    chunks = segment(pcm, max_chunk_ms=4000)
+    assert len(chunks) == 2
+    assert 2700 <= chunks[0][1] <= 2790
+    assert chunks[1][0] == chunks[0][1]
+
+def test_silence_and_clicks_yield_no_chunks():
+    pcm = silence(3000) + tone(60) + silence(3000)
+    assert segment(pcm) == []
@@ -0,0 +1,96 @@
+import pytest
+
+from text_chunker import CHARS_PER_TOKEN, SLIDE_SEPARATOR, estimate_tokens, split_text
+
+def sentences(count, prefix="Sentence"):
+    return [f"{prefix} number {index} talks about something worth saying." for index in range(count)]
+
+def locate(words, chunk_words, not_after):
+    """Offset where chunk_words occur in words, searching from not_after backwards."""
+    for position in range(not_after, -1, -1):
+        if words[position:position + len(chunk_words)] == chunk_words:
+            return position
+    raise AssertionError(f"chunk not found in text: {' '.join(chunk_words[:8])}...")
+
+def assert_covers(text, chunks):
+    # Every chunk is a run of the text's words, each starting no later than where the previous one
+    # ended (overlap) and ending after it, and together they reach from the first word to the last
+    words = text.split()
+    end = 0
+    for chunk in chunks:
+        chunk_words = chunk.split()
+        position = locate(words, chunk_words, end)
+        assert position + len(chunk_words) > end
+        end = position + len(chunk_words)
+    assert end == len(words)
+
+def test_short_text_is_one_chunk():
+    text = " ".join(sentences(3))
+    assert split_text(text, max_tokens=1500) == [text]
+
+@pytest.mark.parametrize("max_tokens,overlap_tokens", [(50, 0), (50, 20), (200, 50), (1500, 250)])
+def test_chunks_cover_text_within_budget(max_tokens, overlap_tokens):
+    paragraphs = ["\n".join(sentences(7, prefix=f"Paragraph {index}")) for index in range(40)]
+    text = "\n\n".join(paragraphs)
+    chunks = split_text(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= max_tokens * CHARS_PER_TOKEN for chunk in chunks)
+    assert_covers(text, chunks)
+
+def test_chunks_end_at_slide_breaks():
+    # Each slide takes about 60% of the budget, so no chunk fits two and every break can be a slide end
+    slides = [" ".join(sentences(5, prefix=f"Slide {index}")) for index in range(12)]
+    text = f"\n{SLIDE_SEPARATOR}\n".join(slides)
+    max_tokens = len(slides[0]) * 10 // (6 * CHARS_PER_TOKEN)
+    chunks = split_text(text, max_tokens=max_tokens, overlap_tokens=0)
+    assert_covers(text, chunks)
+    slide_endings = {slide.split(". ")[-1] for slide in slides}
+    assert all(any(chunk.endswith(ending) for ending in slide_endings) for chunk in chunks)
+
+def test_overlap_repeats_whole_sentences():
+    text = " ".join(sentences(200))
+    overlap_tokens = 40
+    chunks = split_text(text, max_tokens=200, overlap_tokens=overlap_tokens)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        first_sentence = chunk.split(". ")[0] + "."
+        assert first_sentence in previous
+        overlap = previous[previous.index(first_sentence):]
+        assert chunk.startswith(overlap)
+        assert 0 < len(overlap) <= overlap_tokens * CHARS_PER_TOKEN
+
+def test_run_on_text_is_cut_between_words():
+    text = " ".join(f"word{index}" for index in range(3000))
+    chunks = split_text(text, max_tokens=100, overlap_tokens=0)
+    assert all(len(chunk) <= 100 * CHARS_PER_TOKEN for chunk in chunks)
+    assert " ".join(chunks) == text
+
+def test_word_longer_than_budget_is_cut():
+    text = "x" * 1000
+    chunks = split_text(text, max_tokens=50, overlap_tokens=10)
+    assert all(len(chunk) <= 50 * CHARS_PER_TOKEN for chunk in chunks)
+    assert "".join(chunks) == text
+
+@pytest.mark.parametrize("text", ["", None, 42])
+def test_invalid_input_is_rejected(text):
+    with pytest.raises(ValueError):
+        split_text(text)
+
+def test_wide_characters_count_as_a_token_each():
+    assert estimate_tokens("hello world!") == 3
+    assert estimate_tokens("안녕하세요") == 5
+    assert estimate_tokens("こんにちは世界") == 7
+
+def test_korean_chunks_stay_within_token_budget():
+    text = "\n\n".join(" ".join(f"{index}번째 슬라이드의 {sentence}번 문장은 발표 내용을 자세히 설명합니다." for sentence in range(6))
+                       for index in range(30))
+    chunks = split_text(text, max_tokens=300, overlap_tokens=50)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 300 for chunk in chunks)
+    # About one token per Hangul character, so far fewer than the 1200 characters of Latin text
+    assert all(len(chunk) <= 450 for chunk in chunks)
+    assert_covers(text, chunks)
+
+def test_long_korean_word_is_cut_by_tokens():
+    text = "가" * 500
+    chunks = split_text(text, max_tokens=100, overlap_tokens=0)
+    assert [len(chunk) for chunk in chunks] == [100] * 5
@@ -0,0 +1,131 @@
+import re
+import math
+
+# Rough Gemini token estimate for Latin-script text
+CHARS_PER_TOKEN = 4
+# Hangul, kana and CJK ideographs run at about one token per character
+_WIDE_CHARS = re.compile(r'[\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+# Put between slides/pages by the document extractors so chunks can end where a slide ends
+SLIDE_SEPARATOR = "\f"
+
+_SENTENCE_END = re.compile(r'(?<=[.!?。！？])\s+')
+
+# Boundaries from strongest to weakest: slide, paragraph, line, sentence, word
+_BOUNDARIES = [
+    re.compile(r'\s*\f\s*'),
+    re.compile(r'\n\s*\n'),
+    re.compile(r'\n'),
+    _SENTENCE_END,
+    re.compile(r'\s+'),
+]
+# Text rejoining two units, by the boundary between them; the last entry is a cut inside a word
+_JOINERS = ["\n\n", "\n\n", "\n", " ", " ", ""]
+_SENTENCE_LEVEL = 3
+
+def _size(text):
+    """Size of text in 1/CHARS_PER_TOKEN-token steps: one per character, CHARS_PER_TOKEN per wide character."""
+    return len(text) + (CHARS_PER_TOKEN - 1) * len(_WIDE_CHARS.findall(text))
+
+def estimate_tokens(text):
+    return math.ceil(_size(text) / CHARS_PER_TOKEN)
+
+def _cut_word(text, max_size):
+    pieces = []
+    start = 0
+    used = 0
+    for index, char in enumerate(text):
+        char_size = CHARS_PER_TOKEN if _WIDE_CHARS.match(char) else 1
+        if used + char_size > max_size and index > start:
+            pieces.append(text[start:index])
+            start = index
+            used = 0
+        used += char_size
+    pieces.append(text[start:])
+    return pieces
+
+def _split_units(text, max_size, level=0):
+    """Break text into sentences (words for sentences over max_size) as (boundary level, piece) units.
+
+    The level is that of the boundary in front of the piece, so a sentence
+    starting a new slide or paragraph remembers it.
+    """
+    if level > _SENTENCE_LEVEL and _size(text) <= max_size:
+        return [(level, text)]
+    if level == len(_BOUNDARIES):
+        # A single word longer than the budget: cut it
+        return [(level, piece) for piece in _cut_word(text, max_size)]
+    units = []
+    for piece in _BOUNDARIES[level].split(text):
+        piece = piece.strip()
+        if piece:
+            sub_units = _split_units(piece, max_size, level + 1)
+            units.append((level, sub_units[0][1]))
+            units.extend(sub_units[1:])
+    return units
+
+def split_text(text, max_tokens=1500, overlap_tokens=250):
+    """Split text into chunks of about max_tokens estimated tokens, repeating about overlap_tokens between neighbours.
+
+    A chunk ends at the strongest boundary in the second half of its budget:
+    a slide break (SLIDE_SEPARATOR) if there is one, else a paragraph, line,
+    sentence or, for run-on text, word. The next chunk starts with the
+    whole sentences before that break that fit in overlap_tokens. Sizes come
+    from running offsets, so text is scanned once rather than re-measured at
+    every boundary; they count Hangul, kana and CJK characters as a token
+    each, so Korean or Japanese text is not packed four times too densely.
+    """
+    if not text or not isinstance(text, str):
+        raise ValueError("Invalid text input for chunking")
+    # Sizes below are in 1/CHARS_PER_TOKEN-token steps (see _size)
+    max_size = max(CHARS_PER_TOKEN, max_tokens * CHARS_PER_TOKEN)
+    overlap_size = max(0, min(overlap_tokens * CHARS_PER_TOKEN, max_size // 2))
+    units = _split_units(text.strip(), max_size)
+    if not units:
+        return []
+    # ends[i]: size up to the end of unit i in the text rebuilt with _JOINERS
+    ends = []
+    total = 0
+    for level, piece in units:
+        total += len(_JOINERS[level]) + _size(piece)
+        ends.append(total)
+
+    def span(first, last):
+        # Size of units first..last joined, without the joiner in front of first
+        return ends[last] - (ends[first - 1] if first else 0) - len(_JOINERS[units[first][0]])
+
+    def join(first, stop):
+        return "".join((_JOINERS[level] if index > first else "") + piece
+                       for index, (level, piece) in enumerate(units[first:stop], first))
+
+    chunks = []
+    start = 0
+    new_from = 0
+    overlap_start = 0
+    # Latest break candidate in the current chunk for each boundary level
+    latest = {}
+    index = 1
+    while index < len(units):
+        if span(start, index) <= max_size:
+            if index > new_from:
+                latest[units[index][0]] = index
+            index += 1
+            continue
+        cut = index
+        for level in range(len(_JOINERS)):
+            candidate = latest.get(level)
+            if candidate is not None and span(start, candidate - 1) >= max_size // 2:
+                cut = candidate
+                break
+        chunks.append(join(start, cut))
+        # Sentences before the cut that fit the overlap budget and leave room for the unit after it
+        overlap_start = max(overlap_start, start + 1)
+        while overlap_start < cut and (span(overlap_start, cut - 1) > overlap_size
+                                       or units[overlap_start][0] > _SENTENCE_LEVEL
+                                       or span(overlap_start, cut) > max_size):
+            overlap_start += 1
+        start = overlap_start
+        new_from = cut
+        latest = {}
+        index = cut
+    chunks.append(join(start, len(units)))
+    return chunks
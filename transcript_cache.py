@@ -0,0 +1,75 @@
+import os
+import tempfile
+import threading
+from disk_cache import DiskCache
+
+TRANSCRIPT_CACHE_PATH = os.getenv("TRANSCRIPT_CACHE_PATH", os.path.join(tempfile.gettempdir(), "transcript_cache.sqlite3"))
+TRANSCRIPT_CACHE_MAX_MB = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "64"))
+# Cached transcripts are recomputed after this many seconds (default one week)
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600)))
+# Recognized chunks of unfinished transcriptions, so a retry resumes instead of starting over
+TRANSCRIPT_CHECKPOINT_PATH = os.getenv("TRANSCRIPT_CHECKPOINT_PATH", os.path.join(tempfile.gettempdir(), "transcript_checkpoints.sqlite3"))
+TRANSCRIPT_CHECKPOINT_MAX_MB = int(os.getenv("TRANSCRIPT_CHECKPOINT_MAX_MB", "64"))
+TRANSCRIPT_CHECKPOINT_TTL = int(os.getenv("TRANSCRIPT_CHECKPOINT_TTL", str(24 * 3600)))
+
+def media_cache_key(media_sha256, language):
+    """Key for the transcript of an uploaded recording, from the SHA-256 of its bytes."""
+    return f"media:{media_sha256}:{language}"
+
+def youtube_cache_key(video_id, language):
+    """Key for a YouTube video's timed caption records (entries hold {'source', 'records'})."""
+    return f"youtube-records:{video_id}:{language}"
+
+def checkpoint_job_key(media_sha256, language, max_chunk_ms):
+    """Identify one transcription job: the same bytes, language and chunk size always produce the same chunks."""
+    return f"job:{media_sha256}:{language}:{max_chunk_ms}:"
+
+def checkpoint_chunk_key(job_key, start_ms, end_ms):
+    return f"{job_key}{start_ms}-{end_ms}"
+
+_transcript_cache = None
+_transcript_cache_lock = threading.Lock()
+
+def get_transcript_cache():
+    """Return the process-wide transcript cache, or None when caching is disabled."""
+    global _transcript_cache
+    if TRANSCRIPT_CACHE_MAX_MB <= 0:
+        return None
+    with _transcript_cache_lock:
+        if _transcript_cache is None:
+            _transcript_cache = DiskCache(TRANSCRIPT_CACHE_PATH, TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024,
+                                          ttl=TRANSCRIPT_CACHE_TTL)
+        return _transcript_cache
+
+def cached_transcript(key, produce):
+    """Return the cached transcript for key, or call produce() and cache its (non-empty) result."""
+    cache = get_transcript_cache()
+    if cache is None or key is None:
+        return produce()
+    transcript = cache.get(key)
+    if transcript is not None:
+        return transcript
+    transcript = produce()
+    if transcript:
+        cache.put(key, transcript)
+    return transcript
+
+_checkpoint_store = None
+_checkpoint_store_lock = threading.Lock()
+
+def get_checkpoint_store():
+    """Return the process-wide store of per-chunk transcription checkpoints, or None when disabled.
+
+    Entries map checkpoint_chunk_key(...) to the chunk's text ('' for audio
+    the recognizer could not understand). The store is a SQLite file, so a
+    restarted or different worker on the instance picks up where a failed
+    attempt stopped.
+    """
+    global _checkpoint_store
+    if TRANSCRIPT_CHECKPOINT_MAX_MB <= 0:
+        return None
+    with _checkpoint_store_lock:
+        if _checkpoint_store is None:
+            _checkpoint_store = DiskCache(TRANSCRIPT_CHECKPOINT_PATH, TRANSCRIPT_CHECKPOINT_MAX_MB * 1024 * 1024,
+                                          ttl=TRANSCRIPT_CHECKPOINT_TTL)
+        return _checkpoint_store
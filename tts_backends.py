@@ -0,0 +1,129 @@
+import os
+import math
+import array
+import hashlib
+import threading
+from murf import Murf
+from pydub import AudioSegment
+from http_client import download_to_spooled_file
+
+# 'murf' for the Murf AI API, 'local' for the offline deterministic tone backend
+TTS_BACKEND = os.getenv("TTS_BACKEND", "murf")
+
+SUPPORTED_AUDIO_EXTENSIONS = ['mp3', 'wav', 'ogg', 'flv', 'aac']
+
+class TTSBackend:
+    """Interface for text-to-speech engines used by the podcast renderer."""
+
+    name = None
+
+    def is_configured(self):
+        return True
+
+    def generate(self, text, voice_id, logger):
+        """Request speech for text and return whatever load() needs to obtain the audio."""
+        raise NotImplementedError
+
+    def load(self, rendition, logger):
+        """Return the audio of a generate() result as an AudioSegment."""
+        return rendition
+
+    def synthesize(self, text, voice_id, logger):
+        """Return the spoken text as an AudioSegment."""
+        return self.load(self.generate(text, voice_id, logger), logger)
+
+class MurfBackend(TTSBackend):
+    name = 'murf'
+
+    def __init__(self, api_key=None, base_url=None):
+        # Read when the backend is created so keys from .env or a rotated secret are picked up
+        self.api_key = api_key or os.getenv("MURFA_API_KEY")
+        # Override the Murf API endpoint (e.g. a local stand-in server for benchmarks)
+        self.base_url = base_url or os.getenv("MURF_BASE_URL")
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def is_configured(self):
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        # One Murf client per backend so its HTTP connections are reused across renders
+        with self._client_lock:
+            if self._client is None:
+                self._client = Murf(api_key=self.api_key, base_url=self.base_url)
+            return self._client
+
+    @staticmethod
+    def audio_format_from_url(audio_url, logger):
+        file_extension = audio_url.split('?')[0].split('.')[-1].lower()
+        if file_extension not in SUPPORTED_AUDIO_EXTENSIONS:
+            logger.warning(f"Unexpected audio file extension '{file_extension}' from Murf, attempting to load as wav.")
+            file_extension = "wav"
+        return file_extension
+
+    def generate(self, text, voice_id, logger):
+        """Generate speech with Murf (a billed call) and return the URL of the audio file."""
+        tts_response = self.client.text_to_speech.generate(text=text, voice_id=voice_id)
+        audio_url = tts_response.audio_file
+        logger.info(f"Audio URL received from Murf: {audio_url}")
+        return audio_url
+
+    def load(self, audio_url, logger):
+        """Download generated audio as an AudioSegment."""
+        file_extension = self.audio_format_from_url(audio_url, logger)
+        with download_to_spooled_file(audio_url) as audio_file:
+            return AudioSegment.from_file(audio_file, format=file_extension)
+
+class ToneBackend(TTSBackend):
+    """Offline backend that renders each word as a tone burst followed by a short pause.
+
+    Output is deterministic for a given (voice_id, text) and needs no network
+    or API quota, which makes it suitable for local development and for
+    profiling the parse/assemble/encode stages.
+    """
+
+    name = 'local'
+
+    def __init__(self, frame_rate=22050, ms_per_char=60, pause_ms=80, amplitude=8000):
+        self.frame_rate = frame_rate
+        self.ms_per_char = ms_per_char
+        self.pause_ms = pause_ms
+        self.amplitude = amplitude
+
+    def _period(self, voice_id):
+        # Map each voice to a stable pitch between 160 and 400 Hz
+        frequency = 160 + int(hashlib.sha256(voice_id.encode('utf-8')).hexdigest(), 16) % 240
+        samples_per_period = max(2, round(self.frame_rate / frequency))
+        period = array.array('h', (
+            int(self.amplitude * math.sin(2 * math.pi * i / samples_per_period)) for i in range(samples_per_period)
+        ))
+        return period.tobytes(), samples_per_period
+
+    def generate(self, text, voice_id, logger):
+        period, samples_per_period = self._period(voice_id)
+        pause = b'\0\0' * (self.frame_rate * self.pause_ms // 1000)
+        parts = []
+        for word in text.split():
+            samples = self.frame_rate * self.ms_per_char * len(word) // 1000
+            parts.append(period * max(1, samples // samples_per_period))
+            parts.append(pause)
+        return AudioSegment(data=b''.join(parts), sample_width=2, frame_rate=self.frame_rate, channels=1)
+
+TTS_BACKENDS = {
+    MurfBackend.name: MurfBackend,
+    ToneBackend.name: ToneBackend,
+}
+
+_backend_instances = {}
+_backend_lock = threading.Lock()
+
+def get_tts_backend(name=None):
+    """Return the process-wide backend selected by name or the TTS_BACKEND setting."""
+    name = name or TTS_BACKEND
+    if name not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS backend '{name}'. Choose one of: {', '.join(TTS_BACKENDS)}")
+    with _backend_lock:
+        if name not in _backend_instances:
+            _backend_instances[name] = TTS_BACKENDS[name]()
+        return _backend_instances[name]
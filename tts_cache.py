@@ -0,0 +1,105 @@
+import os
+import hashlib
+import tempfile
+import threading
+from pydub import AudioSegment
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts_segment_cache"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "256"))
+
+class SegmentCache:
+    """Content-addressed on-disk cache of synthesized segments with LRU eviction.
+
+    Entries are decoded WAV files named by a hash of (backend, voice_id, text,
+    format). Writes are atomic (temp file + rename) and recency is tracked
+    through file mtimes, so one directory can be shared by every thread and
+    worker process on the instance.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(voice_id, text, audio_format='wav', backend='murf'):
+        digest = hashlib.sha256()
+        for part in (backend, voice_id, text, audio_format):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def contains(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            audio = AudioSegment.from_wav(path)
+            os.utime(path, None)  # Mark as recently used
+            return audio
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Treat unreadable entries (e.g. truncated by a crash) as misses
+            self._remove(path)
+            return None
+
+    def put(self, key, audio):
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                audio.export(temp_file, format='wav')
+            os.replace(temp_path, self._path(key))
+        except Exception:
+            self._remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total_size = 0
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith('.wav'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total_size += stat.st_size
+            if total_size <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total_size <= self.max_bytes:
+                    break
+                self._remove(path)
+                total_size -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+_segment_cache = None
+_segment_cache_lock = threading.Lock()
+
+def get_segment_cache():
+    """Return the process-wide segment cache, or None when caching is disabled."""
+    global _segment_cache
+    if TTS_CACHE_MAX_MB <= 0:
+        return None
+    with _segment_cache_lock:
+        if _segment_cache is None:
+            _segment_cache = SegmentCache()
+        return _segment_cache
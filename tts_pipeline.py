@@ -0,0 +1,110 @@
+import os
+import time
+import httpx
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from murf.core.api_error import ApiError
+
+# Number of script segments synthesized concurrently per render
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "4"))
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "3"))
+TTS_RETRY_DELAY = float(os.getenv("TTS_RETRY_DELAY", "1"))
+
+def is_transient_error(error):
+    """Return True for errors worth retrying (throttling, 5xx, network failures)."""
+    if isinstance(error, ApiError):
+        return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, requests.exceptions.HTTPError):
+        status_code = error.response.status_code if error.response is not None else None
+        return status_code is None or status_code == 429 or status_code >= 500
+    return isinstance(error, (requests.exceptions.RequestException, httpx.TransportError))
+
+def is_retryable_download_error(error):
+    """Return True for download failures the HTTP session has not already retried.
+
+    Connection errors, 429 and 5xx are retried with backoff inside
+    http_client's session; only a body cut off mid-transfer is left.
+    """
+    return isinstance(error, requests.exceptions.ChunkedEncodingError)
+
+def _with_retries(action, is_retryable, description, logger, max_retries, retry_delay):
+    for attempt in range(max_retries):
+        try:
+            return action()
+        except Exception as e:
+            if attempt < max_retries - 1 and is_retryable(e):
+                logger.warning(f"{description} failed on attempt {attempt+1}, retrying: {e}")
+                time.sleep(retry_delay * (attempt + 1))
+                continue
+            raise
+
+def _synthesize_with_retry(backend, index, total, segment, logger, max_retries, retry_delay, cache, on_segment_done):
+    audio = _synthesize_or_load(backend, index, total, segment, logger, max_retries, retry_delay, cache)
+    if on_segment_done is not None:
+        on_segment_done(index)
+    return audio
+
+def _synthesize_or_load(backend, index, total, segment, logger, max_retries, retry_delay, cache):
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(segment['voice_id'], segment['text'], backend=backend.name)
+        audio = cache.get(cache_key)
+        if audio is not None:
+            logger.info(f"Segment {index+1}/{total} served from cache.")
+            return audio
+    logger.info(f"Processing segment {index+1}/{total}: Speaker: {segment['speaker']}, Voice: {segment['voice_id']}")
+    # Generation and download are retried separately: a failed download must not pay for a second generation
+    rendition = _with_retries(lambda: backend.generate(segment['text'], segment['voice_id'], logger),
+                              is_transient_error, f"Segment {index+1} generation", logger, max_retries, retry_delay)
+    audio = _with_retries(lambda: backend.load(rendition, logger),
+                          is_retryable_download_error, f"Segment {index+1} download", logger, max_retries, retry_delay)
+    logger.info(f"Segment {index+1} processed.")
+    if cache is not None:
+        try:
+            cache.put(cache_key, audio)
+        except Exception as e:
+            logger.warning(f"Could not cache segment {index+1}: {e}")
+    return audio
+
+def synthesize_segments(backend, segments, logger, max_workers=TTS_MAX_WORKERS,
+                        max_retries=TTS_MAX_RETRIES, retry_delay=TTS_RETRY_DELAY, cache=None,
+                        on_segment_done=None, on_audio_ready=None):
+    """Synthesize script segments concurrently with a TTSBackend and return their audio in script order.
+
+    Each segment is a dict with 'speaker', 'text' and the resolved 'voice_id'.
+    When a SegmentCache is given, unchanged segments are served from disk and
+    only cache misses reach the backend. Segments are retried independently; a
+    failing segment does not cancel the others, and the first failure (in
+    script order) is re-raised once every segment has finished.
+    on_segment_done, if given, is called from the worker thread with the
+    segment index as each segment completes. on_audio_ready, if given, is
+    called from the calling thread with (index, audio) in script order as soon
+    as a segment and all segments before it are available.
+    """
+    if not segments:
+        return []
+    total = len(segments)
+    worker_count = max(1, min(max_workers, total))
+    logger.info(f"Synthesizing {total} segments with {worker_count} workers")
+    audio_segments = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        futures = [
+            executor.submit(_synthesize_with_retry, backend, i, total, segment, logger, max_retries, retry_delay, cache, on_segment_done)
+            for i, segment in enumerate(segments)
+        ]
+        # Collect in script order so leading segments can be released while later ones are still rendering
+        for i, future in enumerate(futures):
+            try:
+                audio = future.result()
+            except Exception as e:
+                failures.append((i, e))
+                continue
+            audio_segments.append(audio)
+            if on_audio_ready is not None and not failures:
+                on_audio_ready(i, audio)
+    if failures:
+        index, error = failures[0]
+        logger.error(f"{len(failures)} of {total} segments failed; first failure at segment {index+1}: {error}")
+        raise error
+    return audio_segments
@@ -0,0 +1,208 @@
+import os
+import uuid
+import hashlib
+import tempfile
+from flask import Request, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Bytes copied per read when an upload has to be copied rather than adopted
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+# Uploads are parsed straight into this directory and removed once processed
+UPLOAD_SCRATCH_DIR = os.getenv("UPLOAD_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "uploads"))
+
+# Per-route upload limits
+AUDIO_UPLOAD_MAX_MB = int(os.getenv("AUDIO_UPLOAD_MAX_MB", "1000"))
+VIDEO_UPLOAD_MAX_MB = int(os.getenv("VIDEO_UPLOAD_MAX_MB", "1000"))
+DOCUMENT_UPLOAD_MAX_MB = int(os.getenv("DOCUMENT_UPLOAD_MAX_MB", "50"))
+TEXT_UPLOAD_MAX_MB = int(os.getenv("TEXT_UPLOAD_MAX_MB", "5"))
+
+# Room for the other form fields and multipart framing when checking Content-Length
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+class UploadTooLarge(RequestEntityTooLarge):
+    """Raised when an upload exceeds the limit of the route receiving it.
+
+    It is an HTTP 413 rather than a ValueError because it can be raised
+    while werkzeug parses the form, which silently drops ValueErrors.
+    """
+
+    def __init__(self, max_mb):
+        super().__init__(f"File is too large. The maximum upload size is {max_mb} MB.")
+        self.max_mb = max_mb
+
+    def __str__(self):
+        return self.description
+
+def check_request_size(max_mb):
+    """Apply the route's upload limit, raising UploadTooLarge for a request over it.
+
+    A declared Content-Length over the limit is rejected before any of the
+    body is read; otherwise the form is parsed here, with the limit enforced
+    block by block as each file is written, so the error surfaces from this
+    call rather than from a later request.form or request.files access.
+    """
+    request.upload_max_mb = max_mb
+    if request.content_length is not None and request.content_length > max_mb * 1024 * 1024 + FORM_OVERHEAD_BYTES:
+        raise UploadTooLarge(max_mb)
+    request.files
+
+class ScratchUpload:
+    """Write target for one uploaded file: a file in UPLOAD_SCRATCH_DIR, hashed and size-checked per block.
+
+    The form parser writes the multipart part straight into it, so the
+    upload reaches disk once and its SHA-256 is known when parsing ends.
+    Reads, seeks and the rest are passed to the underlying file. The file is
+    deleted on close() unless an IngestedUpload has taken it over.
+    """
+
+    def __init__(self, max_mb):
+        os.makedirs(UPLOAD_SCRATCH_DIR, exist_ok=True)
+        self.path = os.path.join(UPLOAD_SCRATCH_DIR, f"upload_{uuid.uuid4().hex}")
+        self.max_mb = max_mb
+        self.max_bytes = max_mb * 1024 * 1024
+        self.size = 0
+        self.detached = False
+        self._digest = hashlib.sha256()
+        self._file = open(self.path, 'w+b')
+
+    def write(self, block):
+        self.size += len(block)
+        if self.size > self.max_bytes:
+            self.close()
+            raise UploadTooLarge(self.max_mb)
+        self._digest.update(block)
+        return self._file.write(block)
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def detach(self):
+        """Hand the file over to its new owner: close the handle but keep the file."""
+        self.detached = True
+        self._file.close()
+        return self.path
+
+    def close(self):
+        self._file.close()
+        if not self.detached:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+class UploadRequest(Request):
+    """Flask request whose uploaded files are parsed straight into UPLOAD_SCRATCH_DIR.
+
+    Werkzeug would otherwise spool each file to its own temp file first,
+    writing every upload twice. The limit set by check_request_size (or
+    MAX_CONTENT_LENGTH) is enforced as the blocks arrive, and scratch files
+    nobody took over are deleted when the request ends.
+    """
+
+    upload_max_mb = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_mb = self.upload_max_mb
+        if max_mb is None:
+            max_bytes = self.max_content_length or total_content_length or 0
+            max_mb = max(1, -(-max_bytes // (1024 * 1024)))
+        scratch = ScratchUpload(max_mb)
+        self.scratch_uploads.append(scratch)
+        return scratch
+
+    @property
+    def scratch_uploads(self):
+        if 'scratch_uploads' not in self.__dict__:
+            self.__dict__['scratch_uploads'] = []
+        return self.__dict__['scratch_uploads']
+
+    def close(self):
+        super().close()
+        # Files whose part failed to parse never reach request.files, so close them here too
+        for scratch in self.scratch_uploads:
+            scratch.close()
+
+class IngestedUpload:
+    """An upload stored in UPLOAD_SCRATCH_DIR, with the SHA-256 and size of its bytes.
+
+    Consumers read it through path rather than an in-memory copy. Use it as
+    a context manager, or call remove(), to delete the scratch file.
+    """
+
+    def __init__(self, path, sha256, size, filename):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.filename = filename
+
+    def read_text(self, encoding='utf-8'):
+        with open(self.path, 'r', encoding=encoding) as upload_file:
+            return upload_file.read()
+
+    def remove(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.remove()
+
+def ingest_upload(file_storage, max_mb, suffix=''):
+    """Take over an uploaded file as an IngestedUpload.
+
+    Under UploadRequest the form parser has already written the file to
+    UPLOAD_SCRATCH_DIR, hashing and size-checking each block, so the file is
+    adopted (renamed to carry suffix) rather than copied. Any other stream
+    is copied block by block, hashed on the way, and abandoned with
+    UploadTooLarge as soon as it passes max_mb.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, ScratchUpload) and not stream.detached:
+        if stream.size > max_mb * 1024 * 1024:
+            raise UploadTooLarge(max_mb)
+        sha256, size = stream.sha256, stream.size
+        path = stream.detach()
+        if suffix:
+            os.replace(path, path + suffix)
+            path += suffix
+        return IngestedUpload(path, sha256, size, file_storage.filename)
+
+    os.makedirs(UPLOAD_SCRATCH_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_SCRATCH_DIR, f"upload_{uuid.uuid4().hex}{suffix}")
+    max_bytes = max_mb * 1024 * 1024
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, 'wb') as destination:
+            while True:
+                block = stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_mb)
+                digest.update(block)
+                destination.write(block)
+    except Exception:
+        if os.path.exists(path):
+            os.unlink(path)
+        raise
+    return IngestedUpload(path, digest.hexdigest(), size, file_storage.filename)
+
+def read_text_upload(file_storage, max_mb=TEXT_UPLOAD_MAX_MB, encoding='utf-8'):
+    """Decode a small uploaded text file, refusing anything larger than max_mb."""
+    data = file_storage.stream.read(max_mb * 1024 * 1024 + 1)
+    if len(data) > max_mb * 1024 * 1024:
+        raise UploadTooLarge(max_mb)
+    return data.decode(encoding)
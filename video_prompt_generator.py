@@ -1,14 +1,12 @@
 import os
 import re
-import google.generativeai as genai
-from google.generativeai import GenerativeModel
+from gemini_registry import get_model
 
 def generate_video_storyboard(user_input, num_clips=4):
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise Exception("GEMINI_API_KEY environment variable is required")
-    genai.configure(api_key=api_key)
-    model = GenerativeModel("gemini-1.5-flash")
+    model = get_model("gemini-1.5-flash", api_key=api_key)
 
     system_prompt = f"""You are tasked with creating a video prompt and voiceover script based on user input. The user will provide specific topics or ideas for video generation.
 
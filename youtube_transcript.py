@@ -1,12 +1,26 @@
 import re
-from youtube_transcript_api import YouTubeTranscriptApi
-import google.generativeai as genai
-# Add imports for video/audio processing
-import tempfile
-from moviepy.editor import VideoFileClip
-import speech_recognition as sr
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
+from gemini_registry import get_model
 import os
-from pydub import AudioSegment
+from audio_transcript import transcribe_media, transcript_text
+from transcript_cache import cached_transcript, youtube_cache_key
+from text_chunker import estimate_tokens, split_text
+
+# Longest chunk sent to the recognizer for uploaded videos
+VIDEO_MAX_CHUNK_MS = 60 * 1000
+# Batch mode: videos whose transcripts are fetched at once, summaries generated at once, and videos per submission
+YOUTUBE_FETCH_WORKERS = int(os.getenv("YOUTUBE_FETCH_WORKERS", "8"))
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+YOUTUBE_BATCH_MAX_VIDEOS = int(os.getenv("YOUTUBE_BATCH_MAX_VIDEOS", "200"))
+# Estimated transcript tokens sent in one summary prompt; longer transcripts are summarized part by part
+SUMMARY_INPUT_TOKENS = int(os.getenv("SUMMARY_INPUT_TOKENS", "7500"))
+# Parts of one long transcript summarized concurrently
+SUMMARY_CHUNK_WORKERS = int(os.getenv("SUMMARY_CHUNK_WORKERS", "4"))
+
+# Shared client so transcript requests reuse one HTTP session
+_youtube_api = YouTubeTranscriptApi()
 
 def extract_video_id(url):
     """Extract YouTube video ID from URL."""
@@ -25,143 +39,237 @@ def extract_video_id(url):
     
     return None
 
+def get_transcript_records(video_id, language="en"):
+    """Return (source, records) for a YouTube video, served from the transcript cache when it was fetched before.
+
+    records are (start_ms, end_ms, text) tuples, one per caption snippet, in
+    the same shape the speech engine produces for uploads.
+    """
+    cached = cached_transcript(youtube_cache_key(video_id, language), lambda: fetch_transcript(video_id, language))
+    return cached['source'], [tuple(record) for record in cached['records']]
+
+def transcript_header(source):
+    return f"# Transcript Source: {source}\n\n"
+
 def get_transcript(video_id, language="en"):
-    """Get transcript from YouTube video."""
+    """Get transcript text from YouTube video, prefixed with a note about its source."""
+    source, records = get_transcript_records(video_id, language)
+    return transcript_header(source) + transcript_text(records)
+
+def segment_text(segment):
+    """Text of one transcript snippet, whichever shape the API returned it in."""
+    if isinstance(segment, dict):
+        return segment.get("text", "")
+    if hasattr(segment, "text"):
+        return segment.text
+    if hasattr(segment, "__dict__"):
+        return str(segment.__dict__)
+    return str(segment)
+
+def segment_record(segment):
+    """(start_ms, end_ms, text) of one transcript snippet; start and duration are in seconds."""
+    if isinstance(segment, dict):
+        start, duration = segment.get("start", 0), segment.get("duration", 0)
+    else:
+        start, duration = getattr(segment, "start", 0), getattr(segment, "duration", 0)
+    start_ms = int(round(float(start) * 1000))
+    return start_ms, start_ms + int(round(float(duration) * 1000)), segment_text(segment)
+
+def fetch_transcript(video_id, language="en"):
+    """Fetch a transcript from YouTube, bypassing the cache; returns {'source', 'records'}."""
     try:
-        # First try to get the transcript in the requested language
+        # One listing call serves both the requested language and the fallback
+        available_transcripts = _youtube_api.list(video_id)
         try:
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=[language])
-            transcript_source = f"Original {language} transcript"
-        except:
-            # If that fails, list available languages
-            available_transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
-            
-            # Try to find a translatable transcript
-            available_languages = []
-            
-            for transcript in available_transcripts:
-                lang_code = transcript.language_code
-                lang_name = transcript.language
-                is_translatable = transcript.is_translatable
-                available_languages.append((lang_code, lang_name, is_translatable, transcript))
-            
-            # If no translatable transcript is available,
-            # use the first available transcript in its original language
-            if available_languages:
-                selected_lang_code = available_languages[0][0]
-                selected_transcript = available_languages[0][3]
-                
-                transcript_list = selected_transcript.fetch()
-                transcript_source = f"Original {selected_lang_code} transcript"
-            else:
+            selected_transcript = available_transcripts.find_transcript([language])
+        except NoTranscriptFound:
+            # Use the first available transcript in its original language
+            selected_transcript = next(iter(available_transcripts), None)
+            if selected_transcript is None:
                 raise Exception("No transcripts available for this video.")
-        
-        # Concatenate all transcript segments
-        full_transcript = ""
-        for segment in transcript_list:
-            if isinstance(segment, dict) and "text" in segment:
-                full_transcript += segment["text"] + " "
-            else:
-                try:
-                    if hasattr(segment, "text"):
-                        full_transcript += segment.text + " "
-                    elif hasattr(segment, "__dict__"):
-                        full_transcript += str(segment.__dict__) + " "
-                    else:
-                        full_transcript += str(segment) + " "
-                except:
-                    continue
-        
-        # Add a note about the transcript source
-        full_transcript = f"# Transcript Source: {transcript_source}\n\n" + full_transcript
-        
-        return full_transcript
-    
+        transcript_source = f"Original {selected_transcript.language_code} transcript"
+        records = [segment_record(segment) for segment in selected_transcript.fetch()]
+        return {'source': transcript_source, 'records': records}
+
     except Exception as e:
         raise Exception(f"Error extracting transcript: {str(e)}")
 
-def summarize_with_gemini(transcript, api_key, preferred_language='en'):
-    """Summarize transcript using Google's Gemini model in the preferred language. 'api_key' should be GEMINI_API_KEY."""
+# Language instruction (use language codes as keys)
+SUMMARY_LANGUAGE_INSTRUCTIONS = {
+    'en': 'Generate the summary in English.',
+    'ko': 'Generate the summary in Korean. 모든 요약 결과를 한국어로 출력하세요.',
+    'es': 'Genera el resumen en español.',
+    'fr': 'Générez le résumé en français.',
+    'de': 'Erstellen Sie die Zusammenfassung auf Deutsch.',
+    'it': 'Genera il riassunto in italiano.',
+    'pt': 'Gere o resumo em português.',
+    'ru': 'Сделайте резюме на русском языке.',
+    'ja': '要約を日本語で生成してください。',
+    'zh': '请用中文生成摘要。'
+}
+
+def _pack_summaries(summaries, max_tokens):
+    """Group consecutive summaries into batches that fit max_tokens, at least two per batch so every round shrinks."""
+    groups = []
+    group = []
+    group_tokens = 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if len(group) >= 2 and group_tokens + tokens > max_tokens:
+            groups.append(group)
+            group = []
+            group_tokens = 0
+        group.append(summary)
+        group_tokens += tokens
+    if len(group) == 1 and groups:
+        groups[-1].append(group[0])
+    elif group:
+        groups.append(group)
+    return groups
+
+def summarize_with_gemini(transcript, api_key, preferred_language='en', chunk_workers=SUMMARY_CHUNK_WORKERS):
+    """Summarize transcript using Google's Gemini model in the preferred language. 'api_key' should be GEMINI_API_KEY.
+
+    A transcript longer than SUMMARY_INPUT_TOKENS is split into parts that are
+    summarized by up to chunk_workers concurrent requests; the partial
+    summaries are then combined, in rounds if they do not fit one prompt, so
+    the whole transcript is covered.
+    """
     try:
-        # Configure the Gemini API
-        genai.configure(api_key=api_key)
-        
         # Get model name from environment or default
         model_name = os.getenv('GOOGLE_MODEL', 'gemini-pro')
-        # Set up the model
-        model = genai.GenerativeModel(model_name)
-        
-        # Language instruction (use language codes as keys)
-        language_instruction = {
-            'en': 'Generate the summary in English.',
-            'ko': 'Generate the summary in Korean. 모든 요약 결과를 한국어로 출력하세요.',
-            'es': 'Genera el resumen en español.',
-            'fr': 'Générez le résumé en français.',
-            'de': 'Erstellen Sie die Zusammenfassung auf Deutsch.',
-            'it': 'Genera il riassunto in italiano.',
-            'pt': 'Gere o resumo em português.',
-            'ru': 'Сделайте резюме на русском языке.',
-            'ja': '要約を日本語で生成してください。',
-            'zh': '请用中文生成摘要。'
-        }.get(preferred_language, 'Generate the summary in English.')
-        
-        # Generate a summary
-        prompt = f"""Please provide a comprehensive summary of the following transcript. 
-        Focus on the main topics, key points, and important details.
-        {language_instruction}
-        
-        Transcript:
-        {transcript[:30000]}  # Limit to avoid token limits
-        """
-        
-        response = model.generate_content(prompt)
-        return response.text
+        # Shared model handle; the Gemini API is configured once per process
+        model = get_model(model_name, api_key=api_key)
+        language_instruction = SUMMARY_LANGUAGE_INSTRUCTIONS.get(preferred_language, 'Generate the summary in English.')
+
+        if estimate_tokens(transcript) <= SUMMARY_INPUT_TOKENS:
+            # Generate a summary
+            prompt = f"""Please provide a comprehensive summary of the following transcript. 
+            Focus on the main topics, key points, and important details.
+            {language_instruction}
+            
+            Transcript:
+            {transcript}
+            """
+            return model.generate_content(prompt).text
+
+        def summarize_part(part, index, total):
+            prompt = f"""Please summarize part {index + 1} of {total} of a long transcript.
+            Keep the main topics, key points, important details, names and figures; this summary will be combined with the summaries of the other parts.
+            {language_instruction}
+            
+            Transcript part:
+            {part}
+            """
+            return model.generate_content(prompt).text.strip()
+
+        def combine(summaries, final):
+            joined = "\n\n".join(f"Part {index + 1}:\n{summary}" for index, summary in enumerate(summaries))
+            goal = ("a single comprehensive summary of the whole transcript. Focus on the main topics, key points, and important details."
+                    if final else "one summary that keeps their key points, important details, names and figures.")
+            prompt = f"""The following are summaries of consecutive parts of one transcript. Combine them into {goal}
+            {language_instruction}
+            
+            Partial summaries:
+            {joined}
+            """
+            return model.generate_content(prompt).text.strip()
+
+        parts = split_text(transcript, max_tokens=SUMMARY_INPUT_TOKENS, overlap_tokens=100)
+        with ThreadPoolExecutor(max_workers=max(1, min(chunk_workers, len(parts)))) as executor:
+            summaries = list(executor.map(summarize_part, parts, range(len(parts)), [len(parts)] * len(parts)))
+            # Reduce until the partial summaries fit in one prompt
+            while len(summaries) > 1 and sum(estimate_tokens(summary) for summary in summaries) > SUMMARY_INPUT_TOKENS:
+                groups = _pack_summaries(summaries, SUMMARY_INPUT_TOKENS)
+                if len(groups) == 1:
+                    # This round would produce the last summary, so make it the final one
+                    return combine(groups[0], final=True)
+                summaries = list(executor.map(combine, groups, [False] * len(groups)))
+        if len(summaries) == 1:
+            return summaries[0]
+        return combine(summaries, final=True)
     
     except Exception as e:
         raise Exception(f"Error generating summary: {str(e)}")
 
-def transcribe_video_file(video_file_path, language="en-US"):
+def transcribe_video_file(video_file_path, language="en-US", media_sha256=None):
     """
-    Extract audio from a video file and transcribe it to text using speech_recognition.
-    Handles long files by chunking audio into 60-second segments.
-    Returns the transcript as a string.
+    Transcribe the audio track of a video file to text.
+    Only the audio stream is demuxed and resampled to 16 kHz mono, then run
+    through the same chunked recognition engine as audio uploads
+    (60-second maximum chunks). Returns the transcript as a string.
     """
-    recognizer = sr.Recognizer()
-    transcript = ""
-    temp_audio_path = None
     try:
-        # Extract audio from video using moviepy
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-            temp_audio_path = temp_audio.name
-        video = VideoFileClip(video_file_path)
-        video.audio.write_audiofile(temp_audio_path, codec='pcm_s16le')
-        video.close()
-
-        # Chunked transcription
-        audio = AudioSegment.from_wav(temp_audio_path)
-        chunk_length_ms = 60 * 1000  # 60 seconds
-        chunks = [audio[i:i+chunk_length_ms] for i in range(0, len(audio), chunk_length_ms)]
-        
-        for i, chunk in enumerate(chunks):
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as chunk_file:
-                chunk.export(chunk_file.name, format='wav')
-                chunk_path = chunk_file.name
-            try:
-                with sr.AudioFile(chunk_path) as source:
-                    audio_data = recognizer.record(source)
-                    try:
-                        chunk_transcript = recognizer.recognize_google(audio_data, language=language)
-                        transcript += chunk_transcript + " "
-                    except sr.UnknownValueError:
-                        transcript += "[Unintelligible audio] "
-                    except sr.RequestError as e:
-                        transcript += f"[Recognition error: {e}] "
-            finally:
-                if os.path.exists(chunk_path):
-                    os.remove(chunk_path)
-        return transcript.strip()
+        records = transcribe_media(video_file_path, language=language, max_chunk_ms=VIDEO_MAX_CHUNK_MS,
+                                   media_sha256=media_sha256)
+        if not records:
+            raise Exception("Could not generate transcript from the video's audio")
+        return transcript_text(records)
     except Exception as e:
         raise Exception(f"Error transcribing video file: {str(e)}")
-    finally:
-        if temp_audio_path and os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path) 
\ No newline at end of file
+
+def parse_youtube_urls(text):
+    """Split pasted text or a list file into URLs: one per line, or separated by spaces or commas; '#' lines are comments."""
+    urls = []
+    for line in (text or '').splitlines():
+        if not line.strip().startswith('#'):
+            urls.extend(url for url in re.split(r'[\s,]+', line) if url)
+    return urls
+
+def process_youtube_batch(urls, language="en", api_key=None, fetch_workers=YOUTUBE_FETCH_WORKERS,
+                          summary_workers=SUMMARY_MAX_WORKERS):
+    """Fetch (and, with api_key, summarize) the transcripts of many YouTube videos.
+
+    Transcripts are fetched concurrently on one pool; each is handed to a
+    separate, smaller summary pool the moment it arrives, so summaries of the
+    first videos are generated while later transcripts are still loading.
+    A failure only affects its own video. Returns one dict per input URL, in
+    input order: {'url', 'video_id', 'transcript', 'summary', 'error'}.
+    """
+    results = [{'url': url, 'video_id': extract_video_id(url), 'transcript': None, 'summary': None, 'error': None}
+               for url in urls]
+    video_ids = []
+    for result in results:
+        if not result['video_id']:
+            result['error'] = "Invalid YouTube URL."
+        elif result['video_id'] not in video_ids:
+            video_ids.append(result['video_id'])
+
+    transcripts = {}
+    summaries = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def summarize(video_id, transcript):
+        try:
+            # One Gemini request at a time per video, so summary_workers caps the batch's concurrent calls
+            summary = summarize_with_gemini(transcript, api_key, preferred_language=language, chunk_workers=1)
+            with lock:
+                summaries[video_id] = summary
+        except Exception as e:
+            with lock:
+                errors[video_id] = str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, summary_workers)) as summary_executor:
+        def fetch(video_id):
+            try:
+                transcript = get_transcript(video_id, language=language)
+            except Exception as e:
+                with lock:
+                    errors[video_id] = str(e)
+                return
+            with lock:
+                transcripts[video_id] = transcript
+            if api_key and transcript:
+                summary_executor.submit(summarize, video_id, transcript)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(fetch_workers, len(video_ids) or 1))) as fetch_executor:
+            list(fetch_executor.map(fetch, video_ids))
+
+    for result in results:
+        video_id = result['video_id']
+        if video_id:
+            result['transcript'] = transcripts.get(video_id)
+            result['summary'] = summaries.get(video_id)
+            result['error'] = errors.get(video_id)
+    return results